@@ -0,0 +1,220 @@
+"""
+智能资金异常流动评分
+按代币自身的历史基线衡量当前流动是否异常，避免报告总是被大市值代币占据
+
+相对流动 = 24h 净流动 / 持仓价值（即余额变化比例）。
+每个代币维护相对流动的 EWMA 均值和方差，分数为当前值偏离基线的标准差数（z 分数）。
+基线每个采样周期只吸收一个样本（该周期内最后一次观测），与获取次数（/report、预取等）无关。
+观测较少时基线向同一批数据的横截面统计（中位数 / MAD）收缩，没有历史的代币即为横截面稳健 z 分数。
+评分是对全部链、全部代币的批量 NumPy 运算。
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 正态分布下 MAD 换算为标准差的系数
+MAD_TO_STD = 1.4826
+
+
+class AnomalyScorer:
+    """
+    异常流动评分器
+
+    用法:
+        scorer = AnomalyScorer()
+        scorer.update('ETH', holdings)   # 每次获取某条链的持仓后调用（可以很频繁）
+        scorer.top(5)                    # 报告时对所有链统一评分
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        sample_interval: float = 7200,
+        min_history: int = 5,
+        prior_weight: float = 5,
+        min_value_usd: float = 50_000,
+        min_std: float = 0.002,
+        capacity: int = 1024
+    ):
+        """
+        Args:
+            alpha: EWMA 平滑系数，越大越偏重近期
+            sample_interval: 采样周期（秒），同一周期内的多次观测只有最后一次并入基线
+            min_history: 结果中标记为基于历史所需的最少观测次数
+            prior_weight: 横截面统计在基线中的权重（相当于多少次观测）
+            min_value_usd: 参与评分的最小持仓价值，过滤微小代币
+            min_std: 标准差下限（相对流动），避免历史几乎不变的代币分数爆炸
+            capacity: 初始数组容量
+        """
+        self.alpha = alpha
+        self.sample_interval = sample_interval
+        self.min_history = min_history
+        self.prior_weight = prior_weight
+        self.min_value_usd = min_value_usd
+        self.min_std = min_std
+
+        self._lock = threading.Lock()
+        self._slots: Dict[Tuple[str, str], int] = {}  # (链名称, 合约地址) -> 数组下标
+        self._symbols: List[str] = []
+        self._chain_codes: Dict[str, int] = {}
+        self._chain_names: List[str] = []
+        self._size = 0
+
+        self._chain = np.zeros(capacity, dtype=np.int16)
+        self._value = np.zeros(capacity)
+        self._rel = np.zeros(capacity)       # 最新一次的相对流动
+        self._mean = np.zeros(capacity)      # 不含最新一次的 EWMA 基线
+        self._var = np.zeros(capacity)
+        self._count = np.zeros(capacity, dtype=np.int32)  # 基线包含的观测次数
+        self._seen = np.zeros(capacity, dtype=bool)       # 是否已有最新一次观测
+        self._bucket = np.zeros(capacity, dtype=np.int64)  # 最新一次观测所在的采样周期
+        self._active = np.zeros(capacity, dtype=bool)     # 是否在该链最近一次的持仓中
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed: int):
+        capacity = len(self._value)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_chain', '_value', '_rel', '_mean', '_var', '_count', '_seen', '_bucket', '_active'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _slot(self, chain_name: str, item: Dict) -> int:
+        symbol = item.get('token_symbol') or 'Unknown'
+        key = (chain_name, (item.get('token_address') or symbol).lower())
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._symbols)
+            self._symbols.append(symbol)
+        else:
+            self._symbols[slot] = symbol
+        return slot
+
+    def update(self, chain_name: str, holdings: List[Dict], now: Optional[float] = None):
+        """
+        记录某条链最新一次的持仓数据
+
+        本次观测成为"最新"，用于评分；进入新的采样周期时，上一周期的最新观测才并入基线。
+        因此重复评分或同一周期内的多次获取都不会改变基线。
+
+        Args:
+            chain_name: 链名称（如 'ETH'）
+            holdings: smart-money/holdings 返回的条目
+            now: 观测时间（时间戳），默认为当前时间
+        """
+        if not holdings:
+            return
+
+        with self._lock:
+            if chain_name not in self._chain_codes:
+                self._chain_codes[chain_name] = len(self._chain_names)
+                self._chain_names.append(chain_name)
+            code = self._chain_codes[chain_name]
+
+            # 从字典中取值是唯一的逐条操作，只遍历一次
+            slot_list, value_list, pct_list = [], [], []
+            for item in holdings:
+                slot_list.append(self._slot(chain_name, item))
+                value_list.append(item.get('value_usd') or 0)
+                pct_list.append(item.get('balance_24h_percent_change') or 0)
+            slots = np.array(slot_list, dtype=np.int64)
+            value = np.array(value_list, dtype=float)
+            pct = np.array(pct_list, dtype=float)
+
+            self._grow(len(self._symbols))
+            self._size = len(self._symbols)
+
+            bucket = int((time.time() if now is None else now) // self.sample_interval)
+
+            # 上一周期的观测并入 EWMA 基线；前几次观测的权重不低于 1/(n+1)，即从累计均值/方差开始
+            folded = slots[self._seen[slots] & (self._bucket[slots] < bucket)]
+            weight = np.maximum(self.alpha, 1.0 / (self._count[folded] + 1))
+            delta = self._rel[folded] - self._mean[folded]
+            self._mean[folded] += weight * delta
+            self._var[folded] = (1 - weight) * (self._var[folded] + weight * delta * delta)
+            self._count[folded] += 1
+
+            self._chain[slots] = code
+            self._value[slots] = value
+            self._rel[slots] = pct / 100
+            self._seen[slots] = True
+            self._bucket[slots] = bucket
+
+            # 本次持仓中没有的代币不再参与评分
+            self._active[:self._size][self._chain[:self._size] == code] = False
+            self._active[slots] = True
+
+    def scores(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        对所有链的活跃代币评分
+
+        Returns:
+            (下标, z 分数, 是否基于历史)
+        """
+        with self._lock:
+            return self._scores()
+
+    def _scores(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        size = self._size
+        slots = np.flatnonzero(self._active[:size] & (self._value[:size] >= self.min_value_usd))
+        rel = self._rel[slots]
+        count = self._count[slots]
+        has_history = count >= self.min_history
+        if len(slots) == 0:
+            return slots, rel, has_history
+
+        # 横截面稳健统计
+        median = np.median(rel)
+        cross_std = MAD_TO_STD * np.median(np.abs(rel - median))
+
+        # 基线 = 自身历史与横截面统计按观测次数加权，历史越长越接近自身历史
+        history_weight = count / (count + self.prior_weight)
+        mean = history_weight * self._mean[slots] + (1 - history_weight) * median
+        var = history_weight * self._var[slots] + (1 - history_weight) * cross_std * cross_std
+        std = np.maximum(np.sqrt(var), self.min_std)
+
+        return slots, (rel - mean) / std, has_history
+
+    def top(self, limit: int = 5) -> List[Dict]:
+        """
+        偏离最大的代币（按 |z| 降序）
+
+        Returns:
+            [{'token', 'chain', 'net_flow_usd'（带符号）, 'value_usd', 'score', 'baseline'}]
+            baseline 为 'history' 或 'cross'
+        """
+        if limit <= 0:
+            return []
+
+        with self._lock:
+            slots, z, has_history = self._scores()
+            if len(slots) == 0:
+                return []
+
+            magnitude = np.abs(z)
+            if len(slots) > limit:
+                candidates = np.argpartition(-magnitude, limit - 1)[:limit]
+            else:
+                candidates = np.arange(len(slots))
+            order = candidates[np.argsort(-magnitude[candidates])]
+
+            return [
+                {
+                    'token': self._symbols[slots[i]],
+                    'chain': self._chain_names[self._chain[slots[i]]],
+                    'net_flow_usd': float(self._value[slots[i]] * self._rel[slots[i]]),
+                    'value_usd': float(self._value[slots[i]]),
+                    'score': float(z[i]),
+                    'baseline': 'history' if has_history[i] else 'cross'
+                }
+                for i in order
+            ]
@@ -0,0 +1,281 @@
+"""
+性能基准测试
+基于本地测试桩运行，无需真实 API Key
+
+用法:
+    python benchmark.py keys --max-keys 4
+    python benchmark.py webhook --commands 500
+    python benchmark.py hedge --reports 200
+    python benchmark.py report --transport replay:cassettes/prod.jsonl.gz
+    python benchmark.py report --transport synthetic:5000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 基准测试不依赖真实配置
+os.environ.setdefault('NANSEN_API_KEY', 'bench')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:bench')
+os.environ.setdefault('TELEGRAM_CHAT_ID', '1')
+
+from config import Config
+from formatters import MessageFormatter
+from metrics import metrics, percentile
+from nansen_client import NansenClient
+from stubs import FakeTelegramServer, StubNansenServer
+from transport import create_transport
+
+
+def bench_keys(args):
+    """Key 池吞吐量：Key 数量从 1 增加到 max_keys，测量每秒成功请求数"""
+    Config.NANSEN_KEY_RATE_PER_SEC = args.rate * 0.9  # 客户端略低于服务端限速，留出时钟误差
+    Config.NANSEN_KEY_BURST = 1
+    Config.API_RETRY_DELAY = 0.1
+
+    print(f"每个 Key 限速 {args.rate}/s，共 {args.requests} 个请求，并发 {args.workers}")
+    print(f"{'Keys':>4} {'耗时':>8} {'吞吐量':>10} {'429':>5}")
+
+    baseline = None
+    for count in range(1, args.max_keys + 1):
+        keys = [f"key-{i}" for i in range(count)]
+        server = StubNansenServer(keys=keys, rate=args.rate, latency=args.latency).start()
+        client = NansenClient(keys, base_url=server.url)
+
+        def call(_):
+            client._make_request('/api/v1/smart-money/holdings', {'chains': ['ethereum']})
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - started_at
+
+        throughput = args.requests / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{count:>4} {elapsed:>7.2f}s {throughput:>8.1f}/s {server.stats['rejected']:>5}"
+            f"  (x{throughput / baseline:.2f})"
+        )
+        server.stop()
+
+
+async def _run_command_load(mode, args):
+    """启动 bot（polling 或 webhook），测量空闲 CPU 和 /status 命令延迟"""
+    import httpx
+    from bot import SmartMoneyBot
+
+    fake = FakeTelegramServer().start()
+    bot = SmartMoneyBot()
+    app = bot.build_application(base_url=f"{fake.url}/bot")
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    secret = 'bench-secret'
+
+    async with app:
+        await app.start()
+        if mode == 'polling':
+            await app.updater.start_polling(allowed_updates=SmartMoneyBot.ALLOWED_UPDATES, timeout=10)
+        else:
+            await app.updater.start_webhook(
+                listen='127.0.0.1',
+                port=port,
+                url_path='telegram',
+                webhook_url=f"http://127.0.0.1:{port}/telegram",
+                secret_token=secret,
+                allowed_updates=SmartMoneyBot.ALLOWED_UPDATES
+            )
+
+        # 空闲 CPU
+        cpu_start = time.process_time()
+        await asyncio.sleep(args.idle)
+        idle_cpu = (time.process_time() - cpu_start) / args.idle * 100
+
+        # 命令负载：以固定速率注入 /status，记录到收到回复的延迟
+        injected = {}
+        async with httpx.AsyncClient() as http:
+            # 错误的 secret 应被拒绝
+            if mode == 'webhook':
+                response = await http.post(
+                    f"http://127.0.0.1:{port}/telegram",
+                    json=fake.make_command_update('/status', chat_id=1),
+                    headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'}
+                )
+                assert response.status_code == 403, response.status_code
+
+            started_at = time.perf_counter()
+            for i in range(args.commands):
+                chat_id = 10_000 + i
+                update = fake.make_command_update('/status', chat_id=chat_id)
+                injected[chat_id] = time.perf_counter()
+                if mode == 'polling':
+                    fake.push_update(update)
+                else:
+                    asyncio.create_task(http.post(
+                        f"http://127.0.0.1:{port}/telegram",
+                        json=update,
+                        headers={'X-Telegram-Bot-Api-Secret-Token': secret}
+                    ))
+                await asyncio.sleep(1 / args.rate)
+
+            # 等待全部回复
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                if all(fake.first_reply_at(chat_id) for chat_id in injected):
+                    break
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - started_at
+
+        await app.updater.stop()
+        await app.stop()
+
+    fake.stop()
+
+    latencies = [
+        (fake.first_reply_at(chat_id) - sent_at) * 1000
+        for chat_id, sent_at in injected.items()
+        if fake.first_reply_at(chat_id)
+    ]
+    return {
+        'idle_cpu': idle_cpu,
+        'answered': len(latencies),
+        'elapsed': elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99)
+    }
+
+
+def bench_webhook(args):
+    """polling 与 webhook 模式对比：空闲 CPU 与命令延迟"""
+    print(f"/status x {args.commands}，注入速率 {args.rate}/s，空闲采样 {args.idle}s")
+    print(f"{'模式':<8} {'空闲CPU':>8} {'完成':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+    for mode in ('polling', 'webhook'):
+        result = asyncio.run(_run_command_load(mode, args))
+        print(
+            f"{mode:<8} {result['idle_cpu']:>7.1f}% {result['answered']:>6} "
+            f"{result['p50']:>6.1f}ms {result['p95']:>6.1f}ms {result['p99']:>6.1f}ms"
+        )
+
+
+def bench_hedge(args):
+    """对冲请求：桩服务注入长尾延迟，对比开启/关闭对冲时的报告延迟"""
+    Config.NANSEN_KEY_RATE_PER_SEC = 1000
+    Config.NANSEN_KEY_BURST = 100
+
+    print(
+        f"{args.reports} 次报告，请求延迟 {args.latency * 1000:.0f}ms，"
+        f"{args.tail_ratio * 100:.0f}% 请求延迟 {args.tail_latency * 1000:.0f}ms，对冲预算 {args.budget * 100:.0f}%"
+    )
+    print(f"{'对冲':<6} {'p50':>8} {'p95':>8} {'p99':>8} {'请求':>6} {'对冲':>6} {'对冲胜出':>8}")
+
+    for enabled in (False, True):
+        Config.HEDGE_ENABLED = enabled
+        Config.HEDGE_BUDGET_RATIO = args.budget
+
+        server = StubNansenServer(
+            rate=1000,
+            burst=100,
+            latency=args.latency,
+            tail_ratio=args.tail_ratio,
+            tail_latency=args.tail_latency
+        ).start()
+        client = NansenClient(['bench'], base_url=server.url)
+        hedges_before = metrics.count('api.hedges')
+        wins_before = metrics.count('api.hedge_wins')
+
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.reports):
+                started_at = time.perf_counter()
+                client.get_monitoring_report()
+                latencies.append((time.perf_counter() - started_at) * 1000)
+
+        requests_sent = server.stats['requests']
+        print(
+            f"{'开' if enabled else '关':<6} {percentile(latencies, 50):>6.0f}ms "
+            f"{percentile(latencies, 95):>6.0f}ms {percentile(latencies, 99):>6.0f}ms "
+            f"{requests_sent:>6} {metrics.count('api.hedges') - hedges_before:>6} "
+            f"{metrics.count('api.hedge_wins') - wins_before:>8}"
+        )
+        server.stop()
+
+
+def bench_report(args):
+    """用录制文件或合成数据反复生成报告，离线测量获取和格式化耗时"""
+    if args.key_rate:
+        Config.NANSEN_KEY_RATE_PER_SEC = args.key_rate
+        Config.NANSEN_KEY_BURST = max(1, args.key_rate)
+
+    transport = create_transport(args.transport, latency_scale=args.latency_scale)
+    client = NansenClient(Config.NANSEN_API_KEYS, transport=transport)
+    requests_before = metrics.count('api.requests')
+
+    fetch_times = []
+    format_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.reports):
+            started_at = time.perf_counter()
+            report_data = client.get_monitoring_report()
+            fetched_at = time.perf_counter()
+            MessageFormatter.format_report(report_data)
+            fetch_times.append((fetched_at - started_at) * 1000)
+            format_times.append((time.perf_counter() - fetched_at) * 1000)
+
+    print(
+        f"{args.reports} 次报告，传输层 {args.transport}，延迟倍数 {args.latency_scale}，"
+        f"共 {metrics.count('api.requests') - requests_before} 个请求"
+    )
+    print(f"{'阶段':<8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, values in (('获取', fetch_times), ('格式化', format_times)):
+        print(
+            f"{name:<8} {percentile(values, 50):>7.1f}ms {percentile(values, 95):>7.1f}ms "
+            f"{percentile(values, 99):>7.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nansen 客户端性能基准测试")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    keys_parser = subparsers.add_parser('keys', help="API Key 池吞吐量")
+    keys_parser.add_argument('--max-keys', type=int, default=4)
+    keys_parser.add_argument('--rate', type=float, default=10, help="每个 Key 每秒请求数")
+    keys_parser.add_argument('--requests', type=int, default=100)
+    keys_parser.add_argument('--workers', type=int, default=16)
+    keys_parser.add_argument('--latency', type=float, default=0.02, help="桩服务响应延迟（秒）")
+    keys_parser.set_defaults(func=bench_keys)
+
+    webhook_parser = subparsers.add_parser('webhook', help="polling 与 webhook 模式对比（本地假 Telegram 服务）")
+    webhook_parser.add_argument('--commands', type=int, default=300)
+    webhook_parser.add_argument('--rate', type=float, default=100, help="每秒注入命令数")
+    webhook_parser.add_argument('--idle', type=float, default=3, help="空闲 CPU 采样秒数")
+    webhook_parser.set_defaults(func=bench_webhook)
+
+    hedge_parser = subparsers.add_parser('hedge', help="对冲请求对报告长尾延迟的影响")
+    hedge_parser.add_argument('--reports', type=int, default=200)
+    hedge_parser.add_argument('--latency', type=float, default=0.02, help="正常请求延迟（秒）")
+    hedge_parser.add_argument('--tail-ratio', type=float, default=0.02, help="长尾请求比例")
+    hedge_parser.add_argument('--tail-latency', type=float, default=1.0, help="长尾请求延迟（秒）")
+    hedge_parser.add_argument('--budget', type=float, default=0.05, help="对冲预算（占请求比例）")
+    hedge_parser.set_defaults(func=bench_hedge)
+
+    report_parser = subparsers.add_parser('report', help="回放录制文件或合成数据，测量报告生成耗时")
+    report_parser.add_argument('--transport', default='synthetic', help="replay:<文件> 或 synthetic[:<数量>]")
+    report_parser.add_argument('--reports', type=int, default=20)
+    report_parser.add_argument('--latency-scale', type=float, default=1.0, help="回放延迟倍数，0 表示不等待")
+    report_parser.add_argument('--key-rate', type=float, default=0, help="覆盖每个 Key 的限速，0 表示使用配置")
+    report_parser.set_defaults(func=bench_report)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
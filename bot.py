@@ -4,7 +4,11 @@ Telegram Bot 主程序
 """
 import asyncio
 import logging
-from telegram import Update
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from telegram import Bot, Update
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -13,8 +17,12 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 
 from config import Config
+from coordination import Coordinator
 from nansen_client import NansenClient
 from formatters import MessageFormatter
+from job_queue import INTERACTIVE, SCHEDULED, JobQueue
+from metrics import metrics
+from progressive import ProgressiveReport
 from scheduler import ReportScheduler
 
 # 配置日志
@@ -28,14 +36,30 @@ logger = logging.getLogger(__name__)
 class SmartMoneyBot:
     """智能资金监控 Telegram Bot"""
     
+    # 只订阅命令所需的消息更新
+    ALLOWED_UPDATES = [Update.MESSAGE]
+    
     def __init__(self):
         # 验证配置
         Config.validate()
         
         # 初始化组件
-        self.nansen_client = NansenClient(Config.NANSEN_API_KEY)
+        self.nansen_client = NansenClient(Config.NANSEN_API_KEYS)
         self.scheduler = ReportScheduler()
+        self.job_queue = JobQueue(Config.JOB_WORKERS, Config.JOB_MAX_BACKGROUND)
         self.app = None
+        # 预取生成的下一次定时报告: {'message', 'prepared_at'}
+        self._prepared_report = None
+        
+        # 多副本协调：未配置时本实例始终是领导者
+        self.coordinator = None
+        self.is_leader = True
+        # 从共享缓存同步到本地代币索引的持仓: 链名称 -> 写入时间戳
+        self._synced_holdings = {}
+        if Config.COORDINATION_DB:
+            self.coordinator = Coordinator(Config.COORDINATION_DB, Config.REPLICA_ID, Config.LEASE_TTL_SECONDS)
+            self.nansen_client.coordinator = self.coordinator
+            self.is_leader = False
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -47,6 +71,7 @@ class SmartMoneyBot:
             f"• {', '.join(Config.CHAINS.values())}\n\n"
             "📊 *可用命令：*\n"
             "/report - 立即生成监控报告\n"
+            "/token - 查询代币的智能资金持仓\n"
             "/status - 查看监控状态\n"
             "/help - 显示帮助信息\n\n"
             f"⏰ 自动报告间隔：每 {Config.REPORT_INTERVAL_HOURS} 小时"
@@ -74,6 +99,7 @@ class SmartMoneyBot:
             "*命令说明：*\n"
             "/start - 启动机器人\n"
             "/report - 立即生成报告\n"
+            "/token <代号> - 查询代币（支持前缀和合约地址）\n"
             "/status - 查看监控状态\n"
             "/help - 显示本帮助信息\n\n"
             "💡 数据来源：Nansen"
@@ -92,106 +118,447 @@ class SmartMoneyBot:
         next_run = self.scheduler.get_next_run_time()
         
         status_message += f"\n\n⏰ 下次报告时间：{next_run}"
+        status_message += "\n" + MessageFormatter.format_timing_line(
+            metrics.last('report.time_to_first_data'),
+            metrics.last('report.total_time')
+        )
+        status_message += "\n" + MessageFormatter.format_queue_line(
+            self.job_queue.depth(),
+            metrics.percentile('queue.wait.interactive', 95)
+        )
+        if self.coordinator:
+            leader = await asyncio.to_thread(self.coordinator.holder)
+            status_message += "\n" + MessageFormatter.format_replica_line(
+                Config.REPLICA_ID,
+                self.is_leader,
+                leader
+            )
         
         await update.message.reply_text(
             status_message,
             parse_mode=ParseMode.MARKDOWN
         )
     
+    async def token_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        处理 /token 命令 - 从内存索引查询代币，不调用 API
+        """
+        if not context.args:
+            await update.message.reply_text("用法: /token <代号、代号前缀或合约地址>\n例如: /token PEPE")
+            return
+        
+        query = context.args[0]
+        if not self.is_leader:
+            await asyncio.to_thread(self._sync_token_index)
+        
+        entries = self.nansen_client.token_index.lookup(query, limit=Config.TOKEN_LOOKUP_LIMIT)
+        
+        await update.message.reply_text(
+            MessageFormatter.format_token_lookup(query, entries),
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
     async def report_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         处理 /report 命令 - 立即生成报告
+        
+        Returns:
+            报告任务的 Future（结果为是否成功，供压测等调用方等待完成）；重复请求被忽略时为 None
         """
         # 发送"正在生成"消息
         status_msg = await update.message.reply_text("🔄 正在生成报告，请稍候...")
         
-        try:
-            # 生成报告
-            await self.send_report(context)
+        async def run_report():
+            try:
+                # 生成报告（跟随者使用领导者共享的报告，不调用 API）
+                if self.is_leader:
+                    success = await self.send_report(context.bot)
+                else:
+                    await self._send_cached_report(context.bot)
+                    success = True
+                
+                # 删除状态消息
+                await status_msg.delete()
+                return success
+                
+            except Exception as e:
+                logger.error(f"生成报告失败: {str(e)}")
+                await status_msg.edit_text(
+                    MessageFormatter.format_error_message(str(e)),
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                return False
+        
+        # 同一用户的报告请求在完成前只排队一次
+        requester = update.effective_user or update.effective_chat
+        job = await self.job_queue.submit(run_report, INTERACTIVE, dedupe_key=f"report:{requester.id}")
+        if job is None:
+            await status_msg.edit_text("⏳ 您的上一个报告请求仍在处理中，请稍候...")
+        return job
+    
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        处理 /profile 命令（仅管理员）- 在采样分析器下生成一次报告
+        """
+        user = update.effective_user
+        if not user or user.id not in Config.ADMIN_USER_IDS:
+            await update.message.reply_text("⛔ 仅管理员可使用此命令")
+            return
+        
+        # 跟随者不调用 API，分析没有意义，也不应额外消耗额度
+        if not self.is_leader:
+            holder = await asyncio.to_thread(self.coordinator.holder)
+            await update.message.reply_text(
+                f"⏭ 副本 {Config.REPLICA_ID} 是跟随者，请在领导者副本（{holder or '未知'}）上使用 /profile"
+            )
+            return
+        
+        status_msg = await update.message.reply_text("🔬 正在分析报告生成性能，请稍候...")
+        
+        async def run_profile():
+            # 仅在使用时导入，未启用分析时没有任何开销
+            from profiling import SamplingProfiler
             
-            # 删除状态消息
-            await status_msg.delete()
+            profiler = SamplingProfiler()
+            profiler.start()
+            try:
+                with profiler.stage('fetch'):
+                    report_data = await asyncio.to_thread(self.nansen_client.get_monitoring_report)
+                with profiler.stage('format'):
+                    message = MessageFormatter.format_report(report_data)
+                # 报告发给管理员本人，避免打扰频道
+                with profiler.stage('send'):
+                    await context.bot.send_message(
+                        chat_id=update.effective_chat.id,
+                        text=message,
+                        parse_mode=ParseMode.MARKDOWN
+                    )
+            finally:
+                profiler.stop()
             
-        except Exception as e:
-            logger.error(f"生成报告失败: {str(e)}")
-            await status_msg.edit_text(
-                MessageFormatter.format_error_message(str(e)),
-                parse_mode=ParseMode.MARKDOWN
-            )
+            os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+            path = os.path.join(Config.PROFILE_DIR, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+            profiler.write_folded(path)
+            logger.info(f"🔬 性能分析结果已写入 {path}")
+            
+            await status_msg.edit_text(profiler.summary(limit=10))
+            with open(path, 'rb') as f:
+                await update.message.reply_document(f, filename=os.path.basename(path))
+        
+        job = await self.job_queue.submit(run_profile, INTERACTIVE, dedupe_key='profile')
+        if job is None:
+            await status_msg.edit_text("⏳ 已有性能分析在进行中，请稍候...")
     
-    async def send_report(self, context: ContextTypes.DEFAULT_TYPE):
+    async def send_report(self, bot: Bot):
         """
         生成并发送监控报告到指定频道
         
         Args:
-            context: Telegram 上下文
+            bot: Telegram Bot 实例
+            
+        Returns:
+            是否发送成功；失败时已向频道发送错误消息
         """
         try:
             logger.info("开始生成监控报告...")
             
-            # 获取监控数据
-            report_data = self.nansen_client.get_monitoring_report()
-            
-            # 格式化消息
-            message = MessageFormatter.format_report(report_data)
-            
-            # 发送到指定频道/聊天
-            await context.bot.send_message(
-                chat_id=Config.TELEGRAM_CHAT_ID,
-                text=message,
-                parse_mode=ParseMode.MARKDOWN
-            )
+            if Config.PROGRESSIVE_REPORT:
+                # 失败时错误信息已写入报告骨架，不再另发错误消息
+                if not await self._send_progressive_report(bot):
+                    return False
+            else:
+                started_at = time.monotonic()
+                
+                # 获取监控数据（在线程中执行，避免阻塞事件循环）
+                report_data = await asyncio.to_thread(self.nansen_client.get_monitoring_report)
+                
+                # 格式化消息
+                message = MessageFormatter.format_report(report_data)
+                
+                # 发送到指定频道/聊天
+                await bot.send_message(
+                    chat_id=Config.TELEGRAM_CHAT_ID,
+                    text=message,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                metrics.observe('report.total_time', time.monotonic() - started_at)
             
             logger.info("✅ 报告发送成功")
+            return True
             
         except Exception as e:
             logger.error(f"发送报告失败: {str(e)}")
             
             # 发送错误消息
             error_msg = MessageFormatter.format_error_message(str(e))
-            await context.bot.send_message(
+            await bot.send_message(
                 chat_id=Config.TELEGRAM_CHAT_ID,
                 text=error_msg,
                 parse_mode=ParseMode.MARKDOWN
             )
+            return False
+    
+    async def _send_progressive_report(self, bot: Bot):
+        """
+        渐进式发送报告：先发骨架，每条链完成后编辑消息
+        
+        Returns:
+            是否成功；失败时骨架消息已改为错误信息
+        """
+        progress = ProgressiveReport(bot, Config.TELEGRAM_CHAT_ID, Config.PROGRESSIVE_EDIT_INTERVAL)
+        await progress.start()
+        
+        loop = asyncio.get_running_loop()
+        
+        def on_chain_done(period_key, chain_name, chain_data):
+            # 回调在工作线程中触发，切回事件循环处理
+            loop.call_soon_threadsafe(progress.chain_done, period_key, chain_name, chain_data)
+        
+        try:
+            report_data = await asyncio.to_thread(self.nansen_client.get_monitoring_report, on_chain_done)
+            await progress.finish(report_data)
+        except Exception as e:
+            logger.error(f"发送报告失败: {str(e)}")
+            await progress.fail(MessageFormatter.format_error_message(str(e)))
+            return False
+        return True
+    
+    async def _send_cached_report(self, bot: Bot):
+        """
+        跟随者：发送共享缓存中领导者最近一次生成的完整报告
+        
+        报告超过一个报告周期（另加 5 分钟生成时间）未更新时拒绝发送，
+        说明领导者已停止更新，旧报告会误导用户
+        """
+        cached = await asyncio.to_thread(self.coordinator.get, 'report')
+        if cached is None:
+            raise Exception("共享缓存中还没有报告，请稍后再试")
+        
+        report_data, updated_at = cached
+        age = time.time() - updated_at
+        if age > Config.REPORT_INTERVAL_HOURS * 3600 + 300:
+            raise Exception(f"共享缓存中的报告已过期（{age / 60:.0f} 分钟前生成），领导者可能已停止，请稍后再试")
+        
+        await bot.send_message(
+            chat_id=Config.TELEGRAM_CHAT_ID,
+            text=MessageFormatter.format_report(report_data),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        metrics.incr('coordination.cached_reports')
+        logger.info("✅ 报告发送成功（共享缓存）")
+    
+    def _sync_token_index(self):
+        """
+        跟随者：把共享缓存中有更新的持仓同步到本地代币索引
+        """
+        for chain_name in Config.CHAINS.values():
+            key = f'holdings:{chain_name}'
+            updated_at = self.coordinator.updated_at(key)
+            if updated_at is None or updated_at <= self._synced_holdings.get(chain_name, 0):
+                continue
+            
+            cached = self.coordinator.get(key)
+            if cached:
+                holdings, updated_at = cached
+                self.nansen_client.token_index.update_chain(chain_name, holdings)
+                self._synced_holdings[chain_name] = updated_at
+    
+    async def _renew_lease(self) -> bool:
+        """
+        获取或续约领导者租约
+        
+        Returns:
+            本副本是否为领导者
+        """
+        try:
+            is_leader = await asyncio.to_thread(self.coordinator.try_acquire)
+        except Exception as e:
+            # 无法访问协调存储时按跟随者处理，宁可少发也不重复发送
+            logger.error(f"续约失败: {str(e)}")
+            is_leader = False
+        
+        if is_leader != self.is_leader:
+            logger.info(f"🗳 副本 {Config.REPLICA_ID} {'成为领导者' if is_leader else '转为跟随者'}")
+        self.is_leader = is_leader
+        metrics.set_gauge('coordination.leader', 1 if is_leader else 0)
+        return is_leader
     
     async def scheduled_report(self):
         """
-        定时任务：发送报告
+        定时任务：将报告任务放入队列
         """
-        # 创建一个临时的 context 对象用于发送消息
-        await self.send_report(self.app.bot)
+        # 多副本时只有领导者执行
+        if self.coordinator and not await self._renew_lease():
+            return
+        
+        # 在触发时确定本次的计划时间，排队等待不会让报告被算到下一个周期
+        planned_at = self.scheduler.planned_run_time()
+        await self.job_queue.submit(
+            lambda: self._deliver_scheduled_report(planned_at),
+            SCHEDULED,
+            dedupe_key='scheduled_report'
+        )
     
-    def run(self):
+    async def prefetch_report(self):
         """
-        启动 bot
+        定时任务：在下一次报告前预取数据
         """
-        # 创建应用
-        self.app = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+        if self.coordinator and not await self._renew_lease():
+            return
+        
+        await self.job_queue.submit(
+            self._prepare_report,
+            SCHEDULED,
+            dedupe_key='prefetch_report'
+        )
+    
+    async def _prepare_report(self):
+        """
+        获取数据并格式化报告，供下一次定时报告直接发送
+        """
+        logger.info("开始预取下一次报告...")
+        # 时限为预取提前量（而不是 REPORT_SLA_SECONDS）：发送前仍未完成的链在发送时再补齐
+        report_data = await asyncio.to_thread(
+            self.nansen_client.get_monitoring_report,
+            deadline=Config.PREFETCH_LEAD_SECONDS
+        )
+        
+        self._prepared_report = {
+            'report': report_data,
+            'message': MessageFormatter.format_report(report_data),
+            'prepared_at': time.monotonic()
+        }
+        logger.info("✅ 报告预取完成")
+    
+    async def _deliver_scheduled_report(self, planned_at: Optional[datetime] = None):
+        """
+        发送定时报告：有新鲜的预取结果时直接发送，否则现场生成
+        
+        Args:
+            planned_at: 本次报告的计划执行时间
+        """
+        prepared, self._prepared_report = self._prepared_report, None
+        
+        # 每个报告周期只发送一次：领导者切换后新领导者不会重复发送本周期的报告。
+        # 多副本时触发时间对齐到周期边界，周期按计划时间而不是实际执行时间计算
+        if self.coordinator:
+            planned_ts = planned_at.timestamp() if planned_at else time.time()
+            slot = int(planned_ts // (Config.REPORT_INTERVAL_HOURS * 3600))
+            claimed = await asyncio.to_thread(self.coordinator.claim, f'posted:{slot}')
+            if not claimed:
+                logger.info("本周期的报告已由其他副本发送，跳过")
+                return
+        max_age = Config.PREFETCH_LEAD_SECONDS + 60
+        
+        if prepared and time.monotonic() - prepared['prepared_at'] <= max_age:
+            # 预取时超时的链通常已在提前量内完成，用缓存中的新结果重新生成
+            if prepared['report'].get('partial'):
+                report_data = await asyncio.to_thread(self.nansen_client.refresh_late_chains, prepared['report'])
+                prepared['message'] = MessageFormatter.format_report(report_data)
+            try:
+                await self.app.bot.send_message(
+                    chat_id=Config.TELEGRAM_CHAT_ID,
+                    text=prepared['message'],
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                logger.info("✅ 报告发送成功（预取）")
+            except Exception as e:
+                logger.error(f"发送报告失败: {str(e)}")
+        else:
+            await self.send_report(self.app.bot)
+        
+        if planned_at:
+            lag = (datetime.now() - planned_at).total_seconds()
+            metrics.observe('report.delivery_lag', lag)
+            logger.info(f"⏱ 报告延迟: {lag:.1f}s")
+    
+    async def post_init(self, application: Application):
+        """
+        事件循环启动后：启动任务队列和调度器
+        """
+        self.job_queue.start()
+        
+        # 先确定角色再启动定时任务，之后每 1/3 租约时间续约一次
+        if self.coordinator:
+            await self._renew_lease()
+            self.scheduler.add_interval_job(self._renew_lease, Config.LEASE_TTL_SECONDS / 3, 'lease')
+        
+        self.scheduler.add_job(
+            self.scheduled_report,
+            Config.REPORT_INTERVAL_HOURS,
+            prefetch=self.prefetch_report,
+            prefetch_lead_seconds=Config.PREFETCH_LEAD_SECONDS,
+            align=self.coordinator is not None
+        )
+        self.scheduler.start()
+    
+    async def post_stop(self, application: Application):
+        """
+        停止接收更新后：停止调度器，等待队列中的任务完成
+        """
+        self.scheduler.stop()
+        await self.job_queue.stop()
+        
+        # 主动释放租约，其他副本无需等待过期即可接管
+        if self.coordinator and self.is_leader:
+            await asyncio.to_thread(self.coordinator.release)
+            self.is_leader = False
+    
+    def build_application(self, base_url: Optional[str] = None) -> Application:
+        """
+        创建 Telegram 应用并注册命令处理器
+        
+        Args:
+            base_url: Bot API 地址，默认使用官方地址（压测时指向本地假服务）
+        """
+        builder = (
+            Application.builder()
+            .token(Config.TELEGRAM_BOT_TOKEN)
+            .concurrent_updates(Config.CONCURRENT_UPDATES)
+            .post_init(self.post_init)
+            .post_stop(self.post_stop)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        
+        self.app = builder.build()
         
         # 注册命令处理器
         self.app.add_handler(CommandHandler("start", self.start_command))
         self.app.add_handler(CommandHandler("help", self.help_command))
         self.app.add_handler(CommandHandler("status", self.status_command))
         self.app.add_handler(CommandHandler("report", self.report_command))
+        self.app.add_handler(CommandHandler("token", self.token_command))
+        self.app.add_handler(CommandHandler("profile", self.profile_command))
         
-        # 设置定时任务
-        async def send_scheduled_report(context: ContextTypes.DEFAULT_TYPE):
-            await self.send_report(context)
-        
-        self.scheduler.add_job(
-            lambda: asyncio.create_task(send_scheduled_report(self.app.bot)),
-            Config.REPORT_INTERVAL_HOURS
-        )
-        self.scheduler.start()
+        return self.app
+    
+    def run(self):
+        """
+        启动 bot
+        """
+        # 创建应用
+        self.build_application()
         
         # 启动 bot
         logger.info("🤖 Bot 启动中...")
         logger.info(f"📡 监控链: {', '.join(Config.CHAINS.values())}")
         logger.info(f"⏰ 报告间隔: 每 {Config.REPORT_INTERVAL_HOURS} 小时")
         
-        # 运行
-        self.app.run_polling(allowed_updates=Update.ALL_TYPES)
+        # 运行：配置了 WEBHOOK_URL 时使用 webhook，否则使用长轮询
+        # 停止时会先处理完进行中的命令，再等待任务队列清空
+        if Config.WEBHOOK_URL:
+            logger.info(f"🌐 Webhook 模式: 监听 {Config.WEBHOOK_LISTEN}:{Config.WEBHOOK_PORT}")
+            self.app.run_webhook(
+                listen=Config.WEBHOOK_LISTEN,
+                port=Config.WEBHOOK_PORT,
+                url_path=Config.WEBHOOK_PATH,
+                webhook_url=f"{Config.WEBHOOK_URL.rstrip('/')}/{Config.WEBHOOK_PATH}",
+                secret_token=Config.WEBHOOK_SECRET,
+                allowed_updates=self.ALLOWED_UPDATES
+            )
+        else:
+            self.app.run_polling(allowed_updates=self.ALLOWED_UPDATES)
 
 
 def main():
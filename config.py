@@ -3,6 +3,7 @@
 从环境变量读取配置信息
 """
 import os
+import socket
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -13,15 +14,66 @@ class Config:
     
     # Nansen API 配置
     NANSEN_API_KEY = os.getenv('NANSEN_API_KEY')
+    # 多个 Key 用逗号分隔；未设置时只使用 NANSEN_API_KEY
+    NANSEN_API_KEYS = [
+        key.strip()
+        for key in os.getenv('NANSEN_API_KEYS', NANSEN_API_KEY or '').split(',')
+        if key.strip()
+    ]
+    
+    # 每个 Key 的限速和额度
+    NANSEN_KEY_RATE_PER_SEC = float(os.getenv('NANSEN_KEY_RATE_PER_SEC', '1'))
+    NANSEN_KEY_BURST = float(os.getenv('NANSEN_KEY_BURST', '1'))
+    NANSEN_KEY_CREDIT_LIMIT = int(os.getenv('NANSEN_KEY_CREDIT_LIMIT', '0'))  # 每个周期的额度，0 表示不限
+    NANSEN_KEY_CREDIT_PERIOD = float(os.getenv('NANSEN_KEY_CREDIT_PERIOD', str(30 * 86400)))  # 额度周期（秒），0 表示不重置
+    NANSEN_KEY_STORM_THRESHOLD = 3  # 60 秒内出现这么多次 401/429 即暂停该 Key
+    NANSEN_KEY_COOLDOWN = 300  # 秒
     NANSEN_BASE_URL = 'https://api.nansen.ai/v1'
     
+    # 传输层：http（默认）、record:<文件>、replay:<文件>、synthetic[:<数量>]，见 transport.py
+    NANSEN_TRANSPORT = os.getenv('NANSEN_TRANSPORT', 'http')
+    NANSEN_REPLAY_LATENCY_SCALE = float(os.getenv('NANSEN_REPLAY_LATENCY_SCALE', '1'))  # 0 表示不等待
+    
     # Telegram 配置
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
     
+    # 管理员用户 ID（逗号分隔），可使用 /profile 等管理命令
+    ADMIN_USER_IDS = [
+        int(user_id)
+        for user_id in os.getenv('ADMIN_USER_IDS', '').split(',')
+        if user_id.strip()
+    ]
+    
+    # 性能分析结果目录
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    
+    # Webhook 模式：设置 WEBHOOK_URL（公网 HTTPS 地址）后替代长轮询
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+    WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+    
+    # 多副本协调：设置 COORDINATION_DB（各副本共享的 SQLite 文件）后，只有持有租约的
+    # 副本执行定时获取和发送，其余副本从共享缓存回答命令；为空表示单实例运行
+    COORDINATION_DB = os.getenv('COORDINATION_DB', '')
+    LEASE_TTL_SECONDS = float(os.getenv('LEASE_TTL_SECONDS', '30'))
+    REPLICA_ID = os.getenv('REPLICA_ID') or f"{socket.gethostname()}-{os.getpid()}"
+    
+    # 同时处理的命令数
+    CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '32'))
+    
     # 监控配置
     REPORT_INTERVAL_HOURS = int(os.getenv('REPORT_INTERVAL_HOURS', '2'))
     
+    # 定时报告预取：在每次报告前提前多少秒获取数据并格式化，0 表示不预取
+    PREFETCH_LEAD_SECONDS = float(os.getenv('PREFETCH_LEAD_SECONDS', '60'))
+    
+    # 渐进式报告：先发送报告骨架，每条链完成后编辑原消息
+    PROGRESSIVE_REPORT = os.getenv('PROGRESSIVE_REPORT', 'true').lower() == 'true'
+    PROGRESSIVE_EDIT_INTERVAL = float(os.getenv('PROGRESSIVE_EDIT_INTERVAL', '3'))  # 秒，两次编辑的最小间隔
+    
     # 支持的区块链
     CHAINS = {
         'ethereum': 'ETH',
@@ -33,25 +85,50 @@ class Config:
     # 监控时间段（小时）- 简化为只显示24小时数据
     TIME_PERIODS = [24]
     
+    # 报告任务队列：worker 数量和后台任务最大并发
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_MAX_BACKGROUND = int(os.getenv('JOB_MAX_BACKGROUND', '1'))
+    
     # API 配置
     API_TIMEOUT = 30  # 秒
     API_RETRY_TIMES = 3
     API_RETRY_DELAY = 2  # 秒
     
+    # 对冲请求：请求超过该端点 p95 延迟仍未返回时再发送一个副本
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').lower() == 'true'
+    HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.05'))  # 对冲请求最多占总请求的比例
+    HEDGE_PERCENTILE = 95
+    
+    # 报告时限（秒）：超时后先发送已完成的链，其余链使用缓存或标记为待定
+    # 0 表示不限时
+    REPORT_SLA_SECONDS = float(os.getenv('REPORT_SLA_SECONDS', '0'))
+    
     # 每个时间段显示的代币数量
     TOP_TOKENS_COUNT = 5  # Top 5 流入 + Top 5 流出
     
+    # 异常流动：按代币自身历史（EWMA 基线）衡量的偏离程度排名，需要 numpy
+    ANOMALY_SCORING = os.getenv('ANOMALY_SCORING', 'true').lower() == 'true'
+    ANOMALY_TOP_COUNT = 5
+    # 基线采样周期（秒）：每个周期只记一个样本，默认与报告间隔相同
+    ANOMALY_SAMPLE_SECONDS = float(os.getenv('ANOMALY_SAMPLE_SECONDS', str(REPORT_INTERVAL_HOURS * 3600)))
+    ANOMALY_MIN_VALUE_USD = float(os.getenv('ANOMALY_MIN_VALUE_USD', '50000'))  # 过滤微小代币
+    
+    # /token 查询最多返回的条目数
+    TOKEN_LOOKUP_LIMIT = 8
+    
     @classmethod
     def validate(cls):
         """验证必需的配置是否存在"""
         errors = []
         
-        if not cls.NANSEN_API_KEY:
+        if not cls.NANSEN_API_KEYS:
             errors.append("缺少 NANSEN_API_KEY")
         if not cls.TELEGRAM_BOT_TOKEN:
             errors.append("缺少 TELEGRAM_BOT_TOKEN")
         if not cls.TELEGRAM_CHAT_ID:
             errors.append("缺少 TELEGRAM_CHAT_ID")
+        if cls.WEBHOOK_URL and not cls.WEBHOOK_SECRET:
+            errors.append("Webhook 模式需要设置 WEBHOOK_SECRET")
         
         if errors:
             raise ValueError(f"配置错误: {', '.join(errors)}")
@@ -0,0 +1,155 @@
+"""
+多副本协调
+基于共享 SQLite 文件的租约选主和结果缓存
+
+- 租约：同一时刻只有一个副本持有 'leader' 租约，负责定时获取和发送报告；
+  持有者需在 ttl 内续约，否则其他副本可以接管
+- 认领：claim 对同一名称只成功一次，用于保证每个报告周期只发送一次
+- 共享缓存：领导者写入最新报告和各链持仓，其余副本直接读取回答命令
+"""
+import json
+import sqlite3
+import time
+from typing import Any, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class Coordinator:
+    """
+    副本协调器
+
+    所有副本必须使用同一个数据库文件（同一台机器或支持文件锁的共享卷）。
+    时间使用 time.time()，各副本的时钟需要大致同步。
+    """
+
+    def __init__(self, path: str, replica_id: str, lease_ttl: float = 30):
+        self.path = path
+        self.replica_id = replica_id
+        self.lease_ttl = lease_ttl
+
+        with self._connect() as conn:
+            # WAL 模式下读取不会被写入阻塞
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接，可在任意线程中调用；事务由各方法显式控制
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def try_acquire(self, name: str = 'leader') -> bool:
+        """
+        获取或续约租约
+
+        Returns:
+            本副本是否持有租约
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+
+            acquired = row is None or row[0] == self.replica_id or row[1] < now
+            if acquired:
+                conn.execute(
+                    'INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)',
+                    (name, self.replica_id, now + self.lease_ttl)
+                )
+            conn.execute('COMMIT')
+            return acquired
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def release(self, name: str = 'leader'):
+        """主动释放租约（停止时调用，其他副本无需等待过期即可接管）"""
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, self.replica_id))
+        finally:
+            conn.close()
+
+    def holder(self, name: str = 'leader') -> Optional[str]:
+        """当前有效租约的持有者"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT holder FROM leases WHERE name = ? AND expires_at >= ?',
+                (name, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def claim(self, name: str) -> bool:
+        """
+        认领一次性操作
+
+        Returns:
+            首次认领返回 True；已被任一副本认领过返回 False
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO claims (name, holder, claimed_at) VALUES (?, ?, ?)',
+                (name, self.replica_id, time.time())
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def put(self, key: str, value: Any):
+        """写入共享缓存（值需可 JSON 序列化）"""
+        payload = json.dumps(value, ensure_ascii=False)
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, updated_at) VALUES (?, ?, ?)',
+                (key, payload, time.time())
+            )
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        读取共享缓存
+
+        Returns:
+            (值, 写入时间戳)，不存在时返回 None
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT value, updated_at FROM cache WHERE key = ?', (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def updated_at(self, key: str) -> Optional[float]:
+        """只读取写入时间，用于判断缓存是否有更新"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT updated_at FROM cache WHERE key = ?', (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
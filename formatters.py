@@ -18,6 +18,25 @@ class MessageFormatter:
         'BNB': '🟡'
     }
     
+    @staticmethod
+    def escape_markdown(text: str) -> str:
+        """转义 Telegram Markdown 特殊字符"""
+        for char in ('\\', '_', '*', '`', '['):
+            text = text.replace(char, f'\\{char}')
+        return text
+    
+    @staticmethod
+    def format_bold(text: str) -> str:
+        """
+        加粗用户或 API 提供的文本
+        
+        旧版 Markdown 不支持在实体内部转义，含特殊字符的文本只转义、不加粗
+        """
+        escaped = MessageFormatter.escape_markdown(text)
+        if escaped != text:
+            return escaped
+        return f"*{text}*"
+    
     @staticmethod
     def format_value(value: float) -> str:
         """
@@ -82,6 +101,15 @@ class MessageFormatter:
             sections.append("  ⚠️ 数据获取失败\n")
             return "\n".join(sections)
         
+        # 超过报告时限仍未返回
+        if data.get('pending'):
+            sections.append("  ⏳ 数据仍在获取中，将在下次报告中更新\n")
+            return "\n".join(sections)
+        
+        if data.get('stale'):
+            fetched_at = datetime.fromisoformat(data['fetched_at']).strftime('%m-%d %H:%M')
+            sections.append(f"  🕓 缓存数据（更新于 {fetched_at}）")
+        
         # 净流入
         net_inflows = data.get('net_inflows', [])
         if net_inflows:
@@ -102,12 +130,58 @@ class MessageFormatter:
         return "\n".join(sections)
     
     @staticmethod
-    def format_report(report_data: Dict) -> str:
+    def format_pending_section(chain_name: str) -> str:
+        """
+        格式化尚未返回数据的链（渐进式报告占位）
+        """
+        emoji = MessageFormatter.CHAIN_EMOJIS.get(chain_name, '⚪')
+        
+        return "\n".join([
+            f"◆ **{emoji} {chain_name} 聪明钱净流动 TOP 5 (24h)**",
+            "",
+            "  ⏳ 数据加载中...\n",
+            ""
+        ])
+    
+    @staticmethod
+    def format_anomaly_section(anomalies: List[Dict]) -> str:
+        """
+        格式化异常流动（按偏离自身历史基线的程度排序）
+        
+        Args:
+            anomalies: AnomalyScorer.top 的结果
+        
+        Returns:
+            格式化后的文本
+        """
+        if all(item['baseline'] != 'history' for item in anomalies):
+            title = "◆ **⚡ 异常流动 TOP 5（与同批代币比较）**"
+        else:
+            title = "◆ **⚡ 异常流动 TOP 5（相对自身历史）**"
+        sections = [title, ""]
+        
+        for idx, item in enumerate(anomalies, 1):
+            emoji = MessageFormatter.CHAIN_EMOJIS.get(item['chain'], '⚪')
+            symbol = MessageFormatter.escape_markdown(item['token'])
+            sign = "+" if item['net_flow_usd'] >= 0 else "-"
+            net_flow = MessageFormatter.format_value(abs(item['net_flow_usd']))
+            # 历史不足时为与同批代币比较的近似值
+            approx = "" if item['baseline'] == 'history' else "≈"
+            
+            sections.append(f"  {idx}. {emoji} {symbol} ({item['chain']}) {sign}{net_flow} · {approx}{abs(item['score']):.1f}σ")
+        
+        sections.append("")
+        return "\n".join(sections) + "\n"
+    
+    @staticmethod
+    def format_report(report_data: Dict, in_progress: bool = False) -> str:
         """
         格式化完整报告（精简版）
         
         Args:
             report_data: 完整的监控报告数据
+            in_progress: 是否为渐进式推送中的中间版本，
+                为 True 时未完成的链显示占位内容
         
         Returns:
             格式化后的 Telegram 消息
@@ -126,30 +200,105 @@ class MessageFormatter:
         data = report_data.get('data', {})
         period_data = data.get('24h', {})
         
-        if period_data:
-            for chain_name in Config.CHAINS.values():
-                if chain_name in period_data:
-                    message.append(MessageFormatter.format_chain_section(
-                        chain_name,
-                        period_data[chain_name]
-                    ))
+        for chain_name in Config.CHAINS.values():
+            if chain_name in period_data:
+                message.append(MessageFormatter.format_chain_section(
+                    chain_name,
+                    period_data[chain_name]
+                ))
+            elif in_progress:
+                message.append(MessageFormatter.format_pending_section(chain_name))
         
         # 报告尾部
+        if in_progress:
+            done = sum(1 for chain_name in Config.CHAINS.values() if chain_name in period_data)
+            message.extend([
+                "━━━━━━━━━━━━━━━━━━",
+                f"⏳ 正在加载: {done}/{len(Config.CHAINS)} 条链已完成"
+            ])
+            return "\n".join(message)
+        
+        anomalies = report_data.get('anomalies')
+        if anomalies:
+            message.append(MessageFormatter.format_anomaly_section(anomalies))
+        
         message.extend([
             "━━━━━━━━━━━━━━━━━━",
             "💡 数据来源: Nansen Smart Money",
             "📌 净流入 = 聪明钱增持金额",
-            "📌 净流出 = 聪明钱减持金额",
-            f"🔄 下次更新: {Config.REPORT_INTERVAL_HOURS}小时后"
+            "📌 净流出 = 聪明钱减持金额"
         ])
+        if anomalies:
+            message.append("📌 σ = 偏离该代币历史基线的标准差数（≈ 为历史不足时与同批代币比较）")
+        message.append(f"🔄 下次更新: {Config.REPORT_INTERVAL_HOURS}小时后")
         
         return "\n".join(message)
     
+    @staticmethod
+    def format_token_lookup(query: str, entries: List[Dict]) -> str:
+        """
+        格式化 /token 查询结果
+        
+        Args:
+            query: 查询内容
+            entries: TokenIndex.lookup 返回的条目
+        
+        Returns:
+            格式化后的文本
+        """
+        bold = MessageFormatter.format_bold
+        
+        if not entries:
+            return (
+                f"🔍 未找到 {bold(query)}\n\n"
+                "仅收录最近一次报告中各链的智能资金持仓"
+            )
+        
+        lines = [f"🔍 {bold(query)} 智能资金持仓", ""]
+        
+        for entry in entries:
+            emoji = MessageFormatter.CHAIN_EMOJIS.get(entry['chain'], '⚪')
+            flow = entry['net_flow_usd']
+            sign = "+" if flow >= 0 else "-"
+            updated_at = datetime.fromisoformat(entry['updated_at']).strftime('%H:%M')
+            
+            lines.extend([
+                f"{emoji} {bold(entry['symbol'])} ({entry['chain']})",
+                f"  💼 持仓 {MessageFormatter.format_value(entry['value_usd'])} | 👥 {entry['holders']} 个地址",
+                f"  🔄 24h 净流动 {sign}{MessageFormatter.format_value(abs(flow))}",
+                f"  `{entry['address']}` · 更新于 {updated_at}",
+                ""
+            ])
+        
+        return "\n".join(lines)
+    
     @staticmethod
     def format_error_message(error: str) -> str:
         """格式化错误消息"""
         return f"⚠️ **错误**\n\n{error}\n\n请检查配置。"
     
+    @staticmethod
+    def format_timing_line(time_to_first_data, total_time) -> str:
+        """格式化最近一次报告的耗时"""
+        if total_time is None:
+            return "📈 最近报告耗时: 暂无数据"
+        
+        first = f"{time_to_first_data:.1f}s" if time_to_first_data is not None else "-"
+        return f"📈 最近报告耗时: 首批数据 {first} | 总计 {total_time:.1f}s"
+    
+    @staticmethod
+    def format_queue_line(depth: int, wait_p95) -> str:
+        """格式化任务队列状态"""
+        wait = f"{wait_p95:.1f}s" if wait_p95 is not None else "-"
+        return f"📥 任务队列: {depth} 个等待中 | 命令排队 p95 {wait}"
+    
+    @staticmethod
+    def format_replica_line(replica_id: str, is_leader: bool, leader) -> str:
+        """格式化多副本角色"""
+        escape = MessageFormatter.escape_markdown
+        role = "领导者" if is_leader else f"跟随者（领导者: {escape(leader) if leader else '选举中'}）"
+        return f"🗳 副本 {escape(replica_id)}: {role}"
+    
     @staticmethod
     def format_status_message() -> str:
         """格式化状态消息"""
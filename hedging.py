@@ -0,0 +1,72 @@
+"""
+对冲请求策略
+请求超过该端点的历史 p95 延迟仍未返回时，再发送一个副本，取先返回的结果
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+
+class HedgePolicy:
+    """
+    对冲请求策略
+
+    - 每个端点保留最近 window 次成功请求的延迟，样本数达到 min_samples 后
+      以第 percentile 百分位作为对冲等待时间
+    - 对冲预算：每个请求积累 budget_ratio 个令牌，每次对冲消耗 1 个，
+      因此对冲数最多约占请求数的 budget_ratio
+    """
+
+    # 预算令牌上限，避免长时间空闲后集中对冲
+    MAX_TOKENS = 10
+
+    def __init__(
+        self,
+        budget_ratio: float = 0.05,
+        percentile: float = 95,
+        min_samples: int = 20,
+        window: int = 200
+    ):
+        self.budget_ratio = budget_ratio
+        self.percentile = percentile
+        self.min_samples = min_samples
+
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float):
+        """记录一次成功请求的延迟"""
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """
+        开始一个新请求，返回发送对冲副本前应等待的秒数
+
+        Returns:
+            等待秒数；样本不足时返回 None（不对冲）
+        """
+        with self._lock:
+            self._tokens = min(self.MAX_TOKENS, self._tokens + self.budget_ratio)
+
+            samples = self._latencies.get(endpoint)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+
+        index = min(len(ordered) - 1, int(self.percentile / 100 * len(ordered)))
+        return ordered[index]
+
+    def try_hedge(self) -> bool:
+        """消耗一个预算令牌，预算不足时返回 False"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def refund(self):
+        """退还一个预算令牌（对冲最终没有发出时调用）"""
+        with self._lock:
+            self._tokens = min(self.MAX_TOKENS, self._tokens + 1)
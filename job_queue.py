@@ -0,0 +1,179 @@
+"""
+报告任务队列
+按优先级调度报告任务：交互命令 > 定时报告 > 后台补数，并限制并发数
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 优先级（数值越小越优先）
+INTERACTIVE = 0
+SCHEDULED = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: 'interactive',
+    SCHEDULED: 'scheduled',
+    BACKGROUND: 'background'
+}
+
+
+class Job:
+    """队列中的一个任务"""
+
+    def __init__(self, func: Callable[[], Awaitable], priority: int, dedupe_key: Optional[str]):
+        self.func = func
+        self.priority = priority
+        self.dedupe_key = dedupe_key
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class JobQueue:
+    """
+    进程内优先级任务队列
+
+    - workers 个协程并发执行任务，高优先级任务先出队
+    - 非交互任务（定时、后台）最多同时占用 workers - 1 个 worker，保证交互命令总有空闲 worker
+    - 后台任务最多同时运行 max_background 个
+    - 相同 dedupe_key 的任务在前一个完成之前不会重复入队
+    - submit 返回任务的 Future，调用方可以等待任务完成并取得结果
+    """
+
+    def __init__(self, workers: int = 2, max_background: Optional[int] = None):
+        self.workers = workers
+        self.max_background = max(1, workers - 1) if max_background is None else max_background
+        # 只有一个 worker 时无法预留
+        self.max_non_interactive = max(1, workers - 1)
+
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._pending_keys = set()
+        self._cond = asyncio.Condition()
+        self._tasks = []
+        self._closing = False
+
+    def start(self):
+        """启动 worker（需在事件循环中调用）"""
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"任务队列已启动: {self.workers} 个 worker")
+
+    async def submit(
+        self,
+        func: Callable[[], Awaitable],
+        priority: int = SCHEDULED,
+        dedupe_key: Optional[str] = None
+    ) -> Optional[asyncio.Future]:
+        """
+        提交任务
+
+        Args:
+            func: 返回协程的可调用对象
+            priority: INTERACTIVE / SCHEDULED / BACKGROUND
+            dedupe_key: 去重键，已有相同键的任务未完成时忽略本次提交
+
+        Returns:
+            任务完成时得到 func 返回值（或异常）的 Future；因去重被忽略时返回 None
+        """
+        async with self._cond:
+            if self._closing:
+                raise RuntimeError("任务队列已关闭")
+            if dedupe_key is not None:
+                if dedupe_key in self._pending_keys:
+                    metrics.incr('queue.deduped')
+                    return None
+                self._pending_keys.add(dedupe_key)
+
+            job = Job(func, priority, dedupe_key)
+            self._queues[priority].append(job)
+            self._update_depth()
+            self._cond.notify()
+        return job.future
+
+    def depth(self) -> int:
+        """等待中的任务数"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def stop(self, timeout: float = 30):
+        """
+        停止队列：不再接受新任务，等待已入队和运行中的任务完成
+
+        Args:
+            timeout: 最长等待秒数，超时后取消剩余任务
+        """
+        async with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+
+        if not self._tasks:
+            return
+
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"任务队列关闭超时，取消 {len(pending)} 个 worker")
+            # 未执行的任务不会再运行，等待它们的调用方收到取消
+            for queue in self._queues.values():
+                while queue:
+                    queue.popleft().future.cancel()
+            self._update_depth()
+        self._tasks = []
+
+    def _next_job(self) -> Optional[Job]:
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            if priority == BACKGROUND and self._running[BACKGROUND] >= self.max_background:
+                continue
+            if priority != INTERACTIVE and self._running[SCHEDULED] + self._running[BACKGROUND] >= self.max_non_interactive:
+                continue
+            return queue.popleft()
+        return None
+
+    def _update_depth(self):
+        metrics.set_gauge('queue.depth', self.depth())
+        for priority, name in PRIORITY_NAMES.items():
+            metrics.set_gauge(f'queue.depth.{name}', len(self._queues[priority]))
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._closing and self.depth() == 0:
+                        return
+                    await self._cond.wait()
+                    job = self._next_job()
+
+                self._running[job.priority] += 1
+                self._update_depth()
+
+            name = PRIORITY_NAMES[job.priority]
+            metrics.observe(f'queue.wait.{name}', time.monotonic() - job.enqueued_at)
+
+            try:
+                result = await job.func()
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                logger.exception(f"{name} 任务执行失败")
+                job.future.set_exception(e)
+                # 已记录日志；标记为已读取，没有调用方等待时不再重复告警
+                job.future.exception()
+            else:
+                job.future.set_result(result)
+            finally:
+                async with self._cond:
+                    self._running[job.priority] -= 1
+                    self._pending_keys.discard(job.dedupe_key)
+                    self._cond.notify_all()
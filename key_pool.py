@@ -0,0 +1,197 @@
+"""
+API Key 池
+每个 Key 独立限速、统计额度和健康状态，请求分配给负载最低的可用 Key
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from requests.exceptions import RequestException
+
+
+class NoKeyAvailable(RequestException):
+    """没有可用的 API Key（全部暂停、额度用尽或等待超时），重试没有意义"""
+
+
+class TokenBucket:
+    """令牌桶限速器（非线程安全，由 KeyPool 的锁保护）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self, now: float) -> float:
+        """当前可用令牌数"""
+        self._refill(now)
+        return self.tokens
+
+    def wait_time(self, now: float) -> float:
+        """距离下一个令牌可用还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class ApiKey:
+    """单个 API Key 的状态"""
+
+    def __init__(self, key: str, rate: float, burst: float, credit_limit: int, credit_period: float = 0):
+        self.key = key
+        self.bucket = TokenBucket(rate, burst)
+        self.credit_limit = credit_limit  # 0 表示不限
+        self.credit_period = credit_period  # 额度统计周期（秒），0 表示不重置
+        self.credits_used = 0
+        self.credits_reset_at = time.monotonic() + credit_period
+        self.inflight = 0
+        self.requests = 0
+        self.rejections = deque()  # 最近 401/429 的时间
+        self.disabled_until = 0.0
+
+    @property
+    def label(self) -> str:
+        """用于日志的脱敏标识"""
+        return f"{self.key[:6]}..." if len(self.key) > 6 else self.key
+
+    def _roll_credits(self, now: float):
+        """进入新的额度周期时清零已用额度"""
+        if self.credit_period and now >= self.credits_reset_at:
+            self.credits_used = 0
+            periods = (now - self.credits_reset_at) // self.credit_period + 1
+            self.credits_reset_at += periods * self.credit_period
+
+    def is_healthy(self, now: float) -> bool:
+        self._roll_credits(now)
+        if now < self.disabled_until:
+            return False
+        if self.credit_limit and self.credits_used >= self.credit_limit:
+            return False
+        return True
+
+
+class KeyPool:
+    """
+    API Key 池
+
+    acquire() 选择负载最低（进行中请求最少、剩余令牌最多）的健康 Key；
+    在 storm_window 秒内收到 storm_threshold 次 401/429 的 Key 会被暂停 cooldown 秒。
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        rate: float,
+        burst: float,
+        credit_limit: int = 0,
+        credit_period: float = 0,
+        storm_threshold: int = 3,
+        storm_window: float = 60,
+        cooldown: float = 300
+    ):
+        if not keys:
+            raise ValueError("API Key 池不能为空")
+
+        self.keys = [ApiKey(key, rate, burst, credit_limit, credit_period) for key in keys]
+        self.storm_threshold = storm_threshold
+        self.storm_window = storm_window
+        self.cooldown = cooldown
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> ApiKey:
+        """
+        获取一个可用的 Key，必要时等待令牌
+
+        Args:
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            选中的 Key（使用后必须调用 release）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                healthy = [key for key in self.keys if key.is_healthy(now)]
+
+                if healthy:
+                    ready = [key for key in healthy if key.bucket.available(now) >= 1]
+                    if ready:
+                        key = min(ready, key=lambda k: (k.inflight, -k.bucket.tokens))
+                        key.bucket.take()
+                        key.inflight += 1
+                        key.requests += 1
+                        key.credits_used += 1
+                        return key
+                    wait = min(key.bucket.wait_time(now) for key in healthy)
+                else:
+                    # 全部 Key 已暂停或额度用尽：立即失败，不等待冷却结束
+                    raise NoKeyAvailable("所有 API Key 均已暂停或额度用尽")
+
+                if deadline is not None:
+                    if now >= deadline:
+                        raise NoKeyAvailable("没有可用的 API Key")
+                    wait = min(wait, deadline - now)
+
+                self._cond.wait(wait)
+
+    def has_ready_key(self) -> bool:
+        """是否有无需等待即可使用的 Key（健康且有令牌）"""
+        with self._cond:
+            now = time.monotonic()
+            return any(key.is_healthy(now) and key.bucket.available(now) >= 1 for key in self.keys)
+
+    def has_healthy_key(self) -> bool:
+        """是否还有未暂停、额度未用尽的 Key"""
+        with self._cond:
+            now = time.monotonic()
+            return any(key.is_healthy(now) for key in self.keys)
+
+    def release(self, key: ApiKey, status_code: Optional[int] = None):
+        """
+        归还 Key，并根据响应状态码更新健康状态
+
+        Args:
+            key: acquire() 返回的 Key
+            status_code: HTTP 状态码，网络错误时为 None
+        """
+        with self._cond:
+            key.inflight -= 1
+
+            if status_code in (401, 429):
+                now = time.monotonic()
+                key.rejections.append(now)
+                while key.rejections and key.rejections[0] < now - self.storm_window:
+                    key.rejections.popleft()
+
+                if len(key.rejections) >= self.storm_threshold:
+                    key.disabled_until = now + self.cooldown
+                    key.rejections.clear()
+                    print(f"⚠️ API Key {key.label} 频繁返回 {status_code}，暂停 {self.cooldown:.0f} 秒")
+
+            self._cond.notify_all()
+
+    def stats(self) -> List[Dict]:
+        """各 Key 的使用情况"""
+        with self._cond:
+            now = time.monotonic()
+            return [
+                {
+                    'key': key.label,
+                    'healthy': key.is_healthy(now),
+                    'inflight': key.inflight,
+                    'requests': key.requests,
+                    'credits_used': key.credits_used
+                }
+                for key in self.keys
+            ]
@@ -0,0 +1,216 @@
+"""
+Bot 命令压测 / 长稳测试
+用真实的命令处理函数处理构造的 Update，Telegram 和 Nansen 均为本地测试桩
+
+用法:
+    python load_test.py --users 50 --duration 60
+    python load_test.py --users 5 --duration 86400 --sample-interval 600   # 长稳测试
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import time
+from collections import defaultdict
+
+# 压测不依赖真实配置
+os.environ.setdefault('NANSEN_API_KEY', 'load-test')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:load-test')
+os.environ.setdefault('TELEGRAM_CHAT_ID', '1')
+
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from bot import SmartMoneyBot
+from config import Config
+from metrics import metrics, percentile
+from nansen_client import NansenClient
+from stubs import FakeTelegramServer, StubNansenServer
+
+# 虚拟用户的命令分布
+COMMAND_WEIGHTS = {
+    'start': 2,
+    'status': 6,
+    'report': 2
+}
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        # 非 Linux 系统只能取峰值
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LoadTest:
+    """压测运行器"""
+
+    def __init__(self, args):
+        self.args = args
+        self.latencies = defaultdict(list)  # 处理函数 -> 毫秒
+        self.errors = defaultdict(int)
+        self.loop_lag = []  # 毫秒
+        self.rss_samples = []  # (秒, MB)
+        self.stopping = False
+
+    async def setup(self):
+        self.fake_telegram = FakeTelegramServer().start()
+        self.stub_nansen = StubNansenServer(
+            rate=1000,
+            burst=100,
+            latency=self.args.nansen_latency,
+            holdings_count=self.args.holdings
+        ).start()
+
+        # 压测桩服务不限速
+        Config.NANSEN_KEY_RATE_PER_SEC = 1000
+        Config.NANSEN_KEY_BURST = 100
+        Config.PROGRESSIVE_EDIT_INTERVAL = 0.5
+
+        self.bot = SmartMoneyBot()
+        self.bot.nansen_client = NansenClient(['load-test'], base_url=self.stub_nansen.url)
+        self.app = self.bot.build_application(base_url=f"{self.fake_telegram.url}/bot")
+        await self.app.initialize()
+        self.bot.job_queue.start()
+
+    async def teardown(self):
+        await self.bot.job_queue.stop()
+        await self.app.shutdown()
+        self.fake_telegram.stop()
+        self.stub_nansen.stop()
+
+    async def timed(self, name, coro):
+        """计时并统计错误；协程返回 False（报告生成失败）也计为错误"""
+        started_at = time.perf_counter()
+        try:
+            if await coro is False:
+                raise RuntimeError("报告生成失败")
+        except Exception as e:
+            self.errors[name] += 1
+            if self.errors[name] == 1:
+                print(f"❌ {name} 出错: {e!r}")
+        finally:
+            self.latencies[name].append((time.perf_counter() - started_at) * 1000)
+
+    async def report_until_done(self, update, context):
+        """
+        /report：处理函数入队后立即返回，等待报告任务完成才算处理完毕
+
+        Returns:
+            报告是否成功；重复请求被忽略时为 None
+        """
+        job = await self.bot.report_command(update, context)
+        if job is None:
+            return None
+        return await job
+
+    async def virtual_user(self, user_id):
+        handlers = {
+            'start': self.bot.start_command,
+            'status': self.bot.status_command,
+            'report': self.report_until_done
+        }
+        commands = list(COMMAND_WEIGHTS)
+        weights = list(COMMAND_WEIGHTS.values())
+
+        while not self.stopping:
+            command = random.choices(commands, weights)[0]
+            payload = self.fake_telegram.make_command_update(f"/{command}", chat_id=user_id)
+            update = Update.de_json(payload, self.app.bot)
+            context = CallbackContext.from_update(update, self.app)
+
+            await self.timed(command, handlers[command](update, context))
+            await asyncio.sleep(random.expovariate(1 / self.args.think))
+
+    async def scheduled_reports(self):
+        """按固定间隔直接调用 send_report，模拟定时报告"""
+        while not self.stopping:
+            await self.timed('send_report', self.bot.send_report(self.app.bot))
+            await asyncio.sleep(self.args.report_interval)
+
+    async def watch_loop_lag(self, interval=0.1):
+        """事件循环延迟：sleep 的实际时长超出预期的部分"""
+        while not self.stopping:
+            started_at = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.append((time.perf_counter() - started_at - interval) * 1000)
+
+    async def sample_rss(self, started_at):
+        while not self.stopping:
+            self.rss_samples.append((time.perf_counter() - started_at, current_rss_mb()))
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def run(self):
+        await self.setup()
+        started_at = time.perf_counter()
+        print(f"👥 {self.args.users} 个虚拟用户，持续 {self.args.duration:.0f}s，思考时间 {self.args.think}s")
+
+        tasks = [asyncio.create_task(self.virtual_user(1_000 + i)) for i in range(self.args.users)]
+        # 后台任务间隔较长，结束时直接取消
+        monitors = [
+            asyncio.create_task(self.watch_loop_lag()),
+            asyncio.create_task(self.sample_rss(started_at))
+        ]
+        if self.args.report_interval > 0:
+            monitors.append(asyncio.create_task(self.scheduled_reports()))
+
+        await asyncio.sleep(self.args.duration)
+        self.stopping = True
+        for task in monitors:
+            task.cancel()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started_at
+
+        self.rss_samples.append((elapsed, current_rss_mb()))
+        await self.teardown()
+        self.print_results(elapsed)
+
+    def print_results(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"\n📊 共处理 {total} 次调用，{total / elapsed:.1f} 次/秒")
+        print(f"{'处理函数':<12} {'次数':>7} {'错误率':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for name, values in sorted(self.latencies.items()):
+            error_rate = self.errors[name] / len(values) * 100
+            print(
+                f"{name:<12} {len(values):>7} {error_rate:>6.1f}% "
+                f"{percentile(values, 50):>7.1f}ms {percentile(values, 95):>7.1f}ms "
+                f"{percentile(values, 99):>7.1f}ms"
+            )
+
+        wait = metrics.percentile('queue.wait.interactive', 95)
+        if wait is not None:
+            print(f"\n📥 /report 排队 p95: {wait * 1000:.1f}ms，去重 {metrics.count('queue.deduped')} 次")
+        print(
+            f"🔁 事件循环延迟: p50 {percentile(self.loop_lag, 50):.1f}ms "
+            f"p99 {percentile(self.loop_lag, 99):.1f}ms max {max(self.loop_lag, default=0):.1f}ms"
+        )
+
+        print("\n💾 内存 (RSS):")
+        for seconds, rss in self.rss_samples:
+            print(f"  {seconds:>8.0f}s  {rss:>7.1f} MB")
+        if len(self.rss_samples) > 1:
+            growth = self.rss_samples[-1][1] - self.rss_samples[0][1]
+            print(f"  增长 {growth:+.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot 命令压测 / 长稳测试")
+    parser.add_argument('--users', type=int, default=20, help="并发虚拟用户数")
+    parser.add_argument('--duration', type=float, default=30, help="持续时间（秒）")
+    parser.add_argument('--think', type=float, default=1.0, help="用户两次命令之间的平均间隔（秒）")
+    parser.add_argument('--report-interval', type=float, default=10, help="定时报告间隔（秒），0 表示不发送")
+    parser.add_argument('--nansen-latency', type=float, default=0.05, help="Nansen 桩服务延迟（秒）")
+    parser.add_argument('--holdings', type=int, default=200, help="每条链返回的持仓数量")
+    parser.add_argument('--sample-interval', type=float, default=5, help="内存采样间隔（秒）")
+    args = parser.parse_args()
+
+    asyncio.run(LoadTest(args).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+运行指标模块
+进程内记录计时、计数和瞬时值，供 /status 和日志使用
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Optional
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """
+    计算样本的分位数（取最接近的样本，不插值）
+
+    Args:
+        values: 样本
+        pct: 分位 (0-100)
+
+    Returns:
+        分位数值，没有样本时返回 NaN
+    """
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Metrics:
+    """线程安全的进程内指标注册表"""
+
+    # 每个计时指标保留的最近样本数
+    MAX_SAMPLES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.MAX_SAMPLES))
+        self._counters = defaultdict(int)
+        self._gauges = {}
+
+    def observe(self, name: str, value: float):
+        """记录一个样本（通常是秒数）"""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def incr(self, name: str, amount: int = 1):
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] += amount
+
+    def set_gauge(self, name: str, value: float):
+        """设置瞬时值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def last(self, name: str) -> Optional[float]:
+        """获取最近一次样本"""
+        with self._lock:
+            samples = self._samples.get(name)
+            return samples[-1] if samples else None
+
+    def count(self, name: str) -> int:
+        """获取计数器的值"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> Optional[float]:
+        """获取瞬时值"""
+        with self._lock:
+            return self._gauges.get(name)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """
+        计算最近样本的分位数
+
+        Args:
+            name: 指标名称
+            pct: 分位 (0-100)
+
+        Returns:
+            分位数值，没有样本时返回 None
+        """
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+        if not samples:
+            return None
+        return percentile(samples, pct)
+
+    def summary(self) -> Dict:
+        """导出所有指标的快照"""
+        with self._lock:
+            names = list(self._samples)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        timings = {}
+        for name in names:
+            timings[name] = {
+                'last': self.last(name),
+                'p50': self.percentile(name, 50),
+                'p95': self.percentile(name, 95),
+                'p99': self.percentile(name, 99),
+            }
+
+        return {
+            'timings': timings,
+            'counters': counters,
+            'gauges': gauges
+        }
+
+
+# 全局指标实例
+metrics = Metrics()
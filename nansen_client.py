@@ -3,22 +3,178 @@ Nansen API 客户端
 处理与 Nansen API 的所有交互
 """
 import requests
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple, Union
 from config import Config
+from hedging import HedgePolicy
+from key_pool import KeyPool, NoKeyAvailable
+from metrics import metrics
+from token_index import TokenIndex
+from transport import create_transport
 
 
 class NansenClient:
     """Nansen API 客户端类"""
     
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.base_url = 'https://api.nansen.ai'
+    def __init__(
+        self,
+        api_keys: Union[str, List[str]],
+        base_url: str = 'https://api.nansen.ai',
+        transport=None
+    ):
+        """
+        Args:
+            api_keys: 一个或多个 API Key
+            base_url: API 地址
+            transport: 传输层，默认按 Config.NANSEN_TRANSPORT 创建（见 transport.py）
+        """
+        if isinstance(api_keys, str):
+            api_keys = [api_keys]
+        
+        self.base_url = base_url
         self.headers = {
-            'apikey': api_key,  # 注意：Nansen 使用 'apikey' 而不是 'X-API-KEY'
             'Content-Type': 'application/json'
         }
+        self.transport = transport or create_transport(
+            Config.NANSEN_TRANSPORT,
+            latency_scale=Config.NANSEN_REPLAY_LATENCY_SCALE
+        )
+        
+        # 每个 Key 独立限速，请求分配给负载最低的健康 Key
+        self.key_pool = KeyPool(
+            api_keys,
+            rate=Config.NANSEN_KEY_RATE_PER_SEC,
+            burst=Config.NANSEN_KEY_BURST,
+            credit_limit=Config.NANSEN_KEY_CREDIT_LIMIT,
+            credit_period=Config.NANSEN_KEY_CREDIT_PERIOD,
+            storm_threshold=Config.NANSEN_KEY_STORM_THRESHOLD,
+            cooldown=Config.NANSEN_KEY_COOLDOWN
+        )
+        
+        # 最新持仓的代币索引，供 /token 查询
+        self.token_index = TokenIndex()
+        
+        # 异常流动评分（依赖 numpy，仅在启用时导入）
+        self.anomaly_scorer = None
+        if Config.ANOMALY_SCORING:
+            from anomaly import AnomalyScorer
+            self.anomaly_scorer = AnomalyScorer(
+                sample_interval=Config.ANOMALY_SAMPLE_SECONDS,
+                min_value_usd=Config.ANOMALY_MIN_VALUE_USD
+            )
+        
+        # 多副本协调器（可选）：设置后把持仓和完整报告写入共享缓存
+        self.coordinator = None
+        
+        # 对冲请求：超过 p95 延迟时发送副本，两个请求都在独立线程池中执行
+        self.hedge_policy = HedgePolicy(
+            budget_ratio=Config.HEDGE_BUDGET_RATIO,
+            percentile=Config.HEDGE_PERCENTILE
+        )
+        self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='nansen-hedge')
+        
+        # 各链并发获取；超过报告时限仍未完成的任务继续在后台运行
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(Config.CHAINS) * len(Config.TIME_PERIODS),
+            thread_name_prefix='nansen-fetch'
+        )
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        # 每条链最近一次成功的结果: (period_key, chain_name) -> {'data', 'fetched_at'}
+        self._cache: Dict[Tuple[str, str], Dict] = {}
+    
+    def _send_once(
+        self,
+        endpoint: str,
+        body: Optional[Dict],
+        method: str,
+        key_timeout: Optional[float] = None,
+        on_key: Optional[Callable[[], None]] = None
+    ) -> Dict:
+        """
+        使用 Key 池中的一个 Key 发送一次请求（不重试）
+        
+        Args:
+            key_timeout: 等待可用 Key 的最长秒数，None 表示一直等待
+            on_key: 获得 Key、即将发送请求时的回调
+        """
+        key = self.key_pool.acquire(timeout=key_timeout)
+        if on_key:
+            on_key()
+        # 注意：Nansen 使用 'apikey' 而不是 'X-API-KEY'
+        headers = dict(self.headers, apikey=key.key)
+        status_code = None
+        started_at = time.monotonic()
+        
+        try:
+            response = self.transport.send(
+                method,
+                self.base_url,
+                endpoint,
+                headers,
+                body,
+                Config.API_TIMEOUT
+            )
+            
+            status_code = response.status_code
+            response.raise_for_status()
+            data = response.json()
+        finally:
+            self.key_pool.release(key, status_code)
+        
+        self.hedge_policy.record(endpoint, time.monotonic() - started_at)
+        return data
+    
+    def _send_hedged(self, endpoint: str, body: Optional[Dict], method: str) -> Dict:
+        """
+        发送请求；超过该端点 p95 延迟仍未返回时，在预算内再发送一个副本，
+        取先成功返回的结果
+        """
+        delay = self.hedge_policy.hedge_delay(endpoint)
+        if delay is None:
+            return self._send_once(endpoint, body, method)
+        
+        # 对冲等待时间从主请求获得 Key 开始计算，不包括在 Key 池中排队的时间
+        key_acquired = threading.Event()
+        primary = self._hedge_executor.submit(
+            self._send_once, endpoint, body, method, None, key_acquired.set
+        )
+        primary.add_done_callback(lambda _: key_acquired.set())
+        key_acquired.wait()
+        
+        done, _ = wait([primary], timeout=delay)
+        # 没有立即可用的 Key 时对冲只会排在主请求之后，直接放弃，也不消耗预算
+        if done or not self.key_pool.has_ready_key() or not self.hedge_policy.try_hedge():
+            return primary.result()
+        
+        # 对冲副本不等待 Key；只有实际获得 Key（即真正发出请求）才计为一次对冲
+        hedge = self._hedge_executor.submit(
+            self._send_once, endpoint, body, method, 0, lambda: metrics.incr('api.hedges')
+        )
+        
+        def refund_if_not_sent(future):
+            # 检查之后 Key 仍可能被其他请求抢先取走（或主请求先返回、对冲被取消），此时退还预算
+            if future.cancelled() or isinstance(future.exception(), NoKeyAvailable):
+                self.hedge_policy.refund()
+        
+        hedge.add_done_callback(refund_if_not_sent)
+        
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # 另一个请求无法中断，只能丢弃其结果
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        metrics.incr('api.hedge_wins')
+                    return future.result()
+        
+        return primary.result()
     
     def _make_request(self, endpoint: str, body: Optional[Dict] = None, method='POST') -> Dict:
         """
@@ -32,32 +188,23 @@ class NansenClient:
         Returns:
             API 响应数据
         """
-        url = f"{self.base_url}{endpoint}"
+        metrics.incr('api.requests')
         
         for attempt in range(Config.API_RETRY_TIMES):
             try:
-                if method == 'POST':
-                    response = requests.post(
-                        url,
-                        headers=self.headers,
-                        json=body or {},
-                        timeout=Config.API_TIMEOUT
-                    )
-                else:
-                    response = requests.get(
-                        url,
-                        headers=self.headers,
-                        params=body,
-                        timeout=Config.API_TIMEOUT
-                    )
-                
-                response.raise_for_status()
-                return response.json()
+                if Config.HEDGE_ENABLED:
+                    return self._send_hedged(endpoint, body, method)
+                return self._send_once(endpoint, body, method)
             
             except requests.exceptions.RequestException as e:
-                if attempt == Config.API_RETRY_TIMES - 1:
-                    raise Exception(f"API 请求失败: {str(e)}")
-                time.sleep(Config.API_RETRY_DELAY)
+                error = e
+            
+            # 没有可用的 Key（如 401/429 风暴使全部 Key 暂停）时重试没有意义
+            if isinstance(error, NoKeyAvailable) or not self.key_pool.has_healthy_key():
+                raise Exception(f"API 请求失败: {str(error)}")
+            if attempt == Config.API_RETRY_TIMES - 1:
+                raise Exception(f"API 请求失败: {str(error)}")
+            time.sleep(Config.API_RETRY_DELAY)
         
         return {}
     
@@ -65,7 +212,8 @@ class NansenClient:
         self, 
         chains: List[str],
         limit: int = 100,
-        include_24h_changes_only: bool = True
+        include_24h_changes_only: bool = True,
+        raise_errors: bool = False
     ) -> List[Dict]:
         """
         获取智能资金的代币持仓数据
@@ -74,6 +222,7 @@ class NansenClient:
             chains: 区块链列表 (["ethereum"], ["solana"], etc.)
             limit: 返回结果数量
             include_24h_changes_only: 仅包含24小时有变化的代币
+            raise_errors: 失败时抛出异常，而不是返回空列表
             
         Returns:
             代币列表，包含持仓变化数据
@@ -102,6 +251,8 @@ class NansenClient:
             return data.get('data', [])
         except Exception as e:
             print(f"获取 {chains} 智能资金数据失败: {str(e)}")
+            if raise_errors:
+                raise
             return []
     
     def get_token_screener(
@@ -161,8 +312,17 @@ class NansenClient:
         Returns:
             包含 'net_inflows' 和 'net_outflows' 的字典
         """
-        # 获取智能资金持仓数据
-        holdings = self.get_smart_money_holdings([chain], limit=200)
+        # 获取智能资金持仓数据；失败时抛出异常，由调用方标记错误，不会被当作空结果缓存
+        holdings = self.get_smart_money_holdings([chain], limit=200, raise_errors=True)
+        
+        # 刷新代币索引
+        if holdings:
+            chain_name = Config.CHAINS.get(chain, chain)
+            self.token_index.update_chain(chain_name, holdings)
+            if self.anomaly_scorer is not None:
+                self.anomaly_scorer.update(chain_name, holdings)
+            if self.coordinator:
+                self.coordinator.put(f'holdings:{chain_name}', holdings)
         
         net_inflows = []
         net_outflows = []
@@ -206,36 +366,167 @@ class NansenClient:
         }
 
     
-    def get_monitoring_report(self) -> Dict:
+    def _fetch_chain(self, chain_id: str, chain_name: str, hours: int) -> Dict:
+        """
+        获取单条链的数据，成功时写入缓存
+        
+        Returns:
+            链数据；失败时返回带 'error' 字段的字典
+        """
+        key = (f'{hours}h', chain_name)
+        print(f"正在获取 {chain_name} {hours}小时数据...")
+        
+        try:
+            chain_data = self.aggregate_trading_data(chain_id, hours)
+        except Exception as e:
+            print(f"获取 {chain_name} 数据失败: {str(e)}")
+            return {
+                'buys': [],
+                'sells': [],
+                'error': str(e)
+            }
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        
+        with self._lock:
+            self._cache[key] = {
+                'data': chain_data,
+                'fetched_at': datetime.now().isoformat()
+            }
+        return chain_data
+    
+    def _submit_chain(self, chain_id: str, chain_name: str, hours: int) -> Future:
+        """提交链数据获取任务；上次的任务仍在后台运行时直接复用"""
+        key = (f'{hours}h', chain_name)
+        
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._fetch_chain, chain_id, chain_name, hours)
+                self._inflight[key] = future
+        return future
+    
+    def _fallback_chain_data(self, period_key: str, chain_name: str) -> Dict:
+        """
+        超过报告时限时的替代数据：有缓存则返回标记为过期的缓存，否则标记为待定
+        """
+        with self._lock:
+            cached = self._cache.get((period_key, chain_name))
+        
+        if cached:
+            return dict(cached['data'], stale=True, fetched_at=cached['fetched_at'])
+        return {
+            'net_inflows': [],
+            'net_outflows': [],
+            'pending': True
+        }
+    
+    def refresh_late_chains(self, report: Dict) -> Dict:
+        """
+        用报告生成之后才完成的获取结果替换超时的链（过期缓存或待定）
+        
+        Args:
+            report: get_monitoring_report 返回的报告
+            
+        Returns:
+            新的报告；所有超时的链都已补齐时不再标记为部分结果
+        """
+        report = dict(report, data={period_key: dict(period_data) for period_key, period_data in report['data'].items()})
+        complete = True
+        
+        with self._lock:
+            for period_key, period_data in report['data'].items():
+                for chain_name, chain_data in period_data.items():
+                    if not (chain_data.get('stale') or chain_data.get('pending')):
+                        continue
+                    cached = self._cache.get((period_key, chain_name))
+                    if cached and cached['fetched_at'] > report['timestamp']:
+                        period_data[chain_name] = cached['data']
+                    else:
+                        complete = False
+        
+        if complete and report.pop('partial', False):
+            if self.anomaly_scorer is not None:
+                report['anomalies'] = self.anomaly_scorer.top(Config.ANOMALY_TOP_COUNT)
+            if self.coordinator:
+                self.coordinator.put('report', report)
+        return report
+    
+    def get_monitoring_report(
+        self,
+        on_chain_done: Optional[Callable[[str, str, Dict], None]] = None,
+        deadline: Optional[float] = None
+    ) -> Dict:
         """
         生成完整的监控报告
         
+        Args:
+            on_chain_done: 每条链完成后的回调 (period_key, chain_name, chain_data)，
+                用于渐进式推送
+            deadline: 报告时限（秒），默认使用 Config.REPORT_SLA_SECONDS，0 表示不限时。
+                到时仍未完成的链使用缓存或标记为待定，后台继续获取以预热缓存
+        
         Returns:
             包含所有链和时间段的数据
         """
+        sla = Config.REPORT_SLA_SECONDS if deadline is None else deadline
+        deadline_at = time.monotonic() + sla if sla > 0 else None
+        
         report = {
             'timestamp': datetime.now().isoformat(),
             'data': {}
         }
         
+        futures = {}
         for hours in Config.TIME_PERIODS:
             report['data'][f'{hours}h'] = {}
             
             for chain_id, chain_name in Config.CHAINS.items():
-                print(f"正在获取 {chain_name} {hours}小时数据...")
-                
-                try:
-                    chain_data = self.aggregate_trading_data(chain_id, hours)
-                    report['data'][f'{hours}h'][chain_name] = chain_data
-                except Exception as e:
-                    print(f"获取 {chain_name} 数据失败: {str(e)}")
-                    report['data'][f'{hours}h'][chain_name] = {
-                        'buys': [],
-                        'sells': [],
-                        'error': str(e)
-                    }
+                future = self._submit_chain(chain_id, chain_name, hours)
+                futures[future] = (f'{hours}h', chain_name)
+        
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline_at is None else max(0, deadline_at - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                break  # 已超过报告时限
+            
+            for future in done:
+                period_key, chain_name = futures[future]
+                report['data'][period_key][chain_name] = future.result()
                 
-                # 避免 API 限流
-                time.sleep(1)
+                if on_chain_done:
+                    on_chain_done(period_key, chain_name, report['data'][period_key][chain_name])
+        
+        if pending:
+            late_chains = []
+            for future in pending:
+                period_key, chain_name = futures[future]
+                report['data'][period_key][chain_name] = self._fallback_chain_data(period_key, chain_name)
+                late_chains.append(chain_name)
+            
+            print(f"⏱ 超过报告时限 {sla}s，未完成: {', '.join(late_chains)}（后台继续获取）")
+            report['partial'] = True
+            metrics.incr('report.partial')
+            metrics.incr('report.late_chains', len(late_chains))
+        
+        # 所有链一起评分，找出相对自身历史最反常的流动
+        if self.anomaly_scorer is not None:
+            report['anomalies'] = self.anomaly_scorer.top(Config.ANOMALY_TOP_COUNT)
+        
+        # 保持链的固定顺序
+        for period_key, period_data in report['data'].items():
+            report['data'][period_key] = {
+                chain_name: period_data[chain_name]
+                for chain_name in Config.CHAINS.values()
+                if chain_name in period_data
+            }
+        
+        # 只共享完整的报告，其他副本直接使用
+        if self.coordinator and not report.get('partial'):
+            self.coordinator.put('report', report)
         
         return report
@@ -0,0 +1,163 @@
+"""
+报告生成性能分析
+采样式分析器：后台线程定期采集所有线程的调用栈，按阶段归类
+
+未启用时不在任何代码路径中插入钩子，因此没有额外开销。
+输出 flamegraph.pl / speedscope 可直接读取的折叠栈（folded）文件和 Top-N 摘要。
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 阶段识别规则：从栈顶（最内层）向下查找，第一个命中的规则决定阶段
+# (文件名片段, 函数名)，None 表示任意
+STAGE_RULES = [
+    ('json_decode', 'json/decoder.py', None),
+    ('json_decode', 'json/__init__.py', None),
+    ('json_decode', 'requests/models.py', 'json'),
+    ('fetch', 'nansen_client.py', '_send_once'),
+    ('fetch', 'nansen_client.py', '_make_request'),
+    ('anomaly', 'anomaly.py', None),
+    ('aggregate', 'nansen_client.py', 'aggregate_trading_data'),
+    ('format', 'formatters.py', 'format_report'),
+    ('send', None, 'send_message'),
+    ('send', None, 'send_telegram_message'),
+]
+
+STAGE_ORDER = ['fetch', 'json_decode', 'aggregate', 'anomaly', 'format', 'send']
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _classify(codes) -> Optional[str]:
+    """codes 为从栈顶到栈底的代码对象列表"""
+    for code in codes:
+        filename = code.co_filename.replace('\\', '/')
+        for stage, file_part, func in STAGE_RULES:
+            if file_part and not filename.endswith(file_part):
+                continue
+            if func and code.co_name != func:
+                continue
+            return stage
+    return None
+
+
+class SamplingProfiler:
+    """
+    采样式分析器
+
+    用法:
+        profiler = SamplingProfiler()
+        profiler.start()
+        with profiler.stage('send'):
+            ...
+        profiler.stop()
+        profiler.write_folded('profile.folded')
+        print(profiler.summary())
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()  # (stage, frame, ...) -> 次数，frame 从栈底到栈顶
+        self.stage_times: Dict[str, float] = {}  # 显式计时的阶段墙钟耗时
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self._started_at
+
+    @contextmanager
+    def stage(self, name: str):
+        """显式记录某个阶段的墙钟耗时（用于采样看不到的异步等待）"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+
+                stage = _classify(codes)
+                if stage is None:
+                    continue  # 空闲线程或与报告无关的代码
+
+                stack = tuple(_frame_label(code) for code in reversed(codes))
+                self.samples[(stage,) + stack] += 1
+
+    def sample_seconds(self) -> float:
+        """每个样本代表的秒数"""
+        return self.elapsed / self.ticks if self.ticks else self.interval
+
+    def write_folded(self, path: str):
+        """写入折叠栈文件：每行 "阶段;帧;帧;... 次数" """
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def stage_breakdown(self) -> List[Tuple[str, int, float]]:
+        """各阶段的 (名称, 样本数, 估算秒数)"""
+        counts = Counter()
+        for stack, count in self.samples.items():
+            counts[stack[0]] += count
+
+        per_sample = self.sample_seconds()
+        stages = sorted(counts, key=lambda name: STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER))
+        return [(name, counts[name], counts[name] * per_sample) for name in stages]
+
+    def top_functions(self, limit: int = 15) -> List[Tuple[str, int]]:
+        """按自身耗时（栈顶样本数）排序的函数"""
+        counts = Counter()
+        for stack, count in self.samples.items():
+            counts[stack[-1]] += count
+        return counts.most_common(limit)
+
+    def summary(self, limit: int = 15) -> str:
+        total = sum(self.samples.values()) or 1
+        lines = [f"总耗时 {self.elapsed:.2f}s，采样 {self.ticks} 次（间隔 {self.interval * 1000:.0f}ms）", ""]
+
+        if self.stage_times:
+            lines.append("阶段墙钟耗时:")
+            for name, seconds in self.stage_times.items():
+                lines.append(f"  {name:<12} {seconds:>7.3f}s")
+            lines.append("")
+
+        lines.append("阶段采样（各线程累计）:")
+        for name, count, seconds in self.stage_breakdown():
+            lines.append(f"  {name:<12} {seconds:>7.3f}s {count / total * 100:>5.1f}%")
+
+        lines.append("")
+        lines.append(f"Top {limit} 函数（自身）:")
+        for label, count in self.top_functions(limit):
+            lines.append(f"  {count / total * 100:>5.1f}%  {label}")
+
+        return "\n".join(lines)
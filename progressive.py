@@ -0,0 +1,133 @@
+"""
+渐进式报告推送
+先发送报告骨架，随后每条链返回数据时原地编辑消息
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from telegram import Bot, Message
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from formatters import MessageFormatter
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressiveReport:
+    """
+    渐进式报告消息
+
+    编辑会被合并（debounce），两次 edit_message_text 之间至少间隔
+    min_interval 秒，以避免触发 Telegram 的编辑频率限制。
+    """
+
+    def __init__(self, bot: Bot, chat_id, min_interval: float):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+
+        self.report_data = {
+            'timestamp': datetime.now().isoformat(),
+            'data': {}
+        }
+        self.message: Optional[Message] = None
+        self.started_at = None
+        self.first_data_at = None
+
+        self._last_edit = 0.0
+        self._last_text = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._edit_lock = asyncio.Lock()
+
+    async def start(self):
+        """发送报告骨架"""
+        self.started_at = time.monotonic()
+        text = MessageFormatter.format_report(self.report_data, in_progress=True)
+
+        self.message = await self.bot.send_message(
+            chat_id=self.chat_id,
+            text=text,
+            parse_mode=ParseMode.MARKDOWN
+        )
+        self._last_edit = time.monotonic()
+        self._last_text = text
+
+    def chain_done(self, period_key: str, chain_name: str, chain_data: Dict):
+        """
+        某条链数据就绪（需在事件循环线程中调用）
+        """
+        self.report_data['data'].setdefault(period_key, {})[chain_name] = chain_data
+
+        if self.first_data_at is None:
+            self.first_data_at = time.monotonic()
+            metrics.observe('report.time_to_first_data', self.first_data_at - self.started_at)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def finish(self, report_data: Dict):
+        """
+        用完整报告做最后一次编辑，标记报告完成
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+        self.report_data = report_data
+        await self._edit(MessageFormatter.format_report(report_data))
+
+        metrics.observe('report.total_time', time.monotonic() - self.started_at)
+
+    async def fail(self, text: str):
+        """
+        报告生成失败：把骨架消息改为错误信息，避免频道中留下一直"加载中"的消息
+
+        Args:
+            text: 错误信息（Markdown）
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+        try:
+            await self._edit(text)
+        except TelegramError as e:
+            logger.warning(f"无法更新报告骨架，改为删除: {str(e)}")
+            try:
+                await self.message.delete()
+            except TelegramError as e:
+                logger.error(f"删除报告骨架失败: {str(e)}")
+
+    async def _flush_later(self):
+        """等待到允许的编辑时间后，推送当前进度"""
+        delay = self._last_edit + self.min_interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # 后台任务没有调用方等待，进度编辑失败只记录日志，由下一次编辑或 finish 补上
+        try:
+            await self._edit(MessageFormatter.format_report(self.report_data, in_progress=True))
+        except TelegramError as e:
+            logger.warning(f"更新报告进度失败: {str(e)}")
+
+    async def _edit(self, text: str):
+        async with self._edit_lock:
+            if text == self._last_text:
+                return
+
+            try:
+                await self.message.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+            except RetryAfter as e:
+                # 被限流时等待后重试一次
+                await asyncio.sleep(e.retry_after)
+                await self.message.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+            except BadRequest as e:
+                # 内容未变化时 Telegram 会报错，忽略即可
+                if 'not modified' not in str(e).lower():
+                    raise
+
+            self._last_edit = time.monotonic()
+            self._last_text = text
@@ -4,9 +4,9 @@
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
-from typing import Callable
+from typing import Callable, Optional
 
 
 class ReportScheduler:
@@ -15,12 +15,17 @@ class ReportScheduler:
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
         self.is_running = False
+        # 每个任务的计划起点和间隔，用于计算计划执行时间
+        self._anchors = {}
     
     def add_job(
         self,
         func: Callable,
         interval_hours: int,
-        job_id: str = 'monitoring_report'
+        job_id: str = 'monitoring_report',
+        prefetch: Optional[Callable] = None,
+        prefetch_lead_seconds: float = 0,
+        align: bool = False
     ):
         """
         添加定时任务
@@ -29,18 +34,89 @@ class ReportScheduler:
             func: 要执行的异步函数
             interval_hours: 执行间隔（小时）
             job_id: 任务ID
+            prefetch: 预取函数，在每次执行前 prefetch_lead_seconds 秒运行
+            prefetch_lead_seconds: 预取提前量（秒），0 表示不预取
+            align: 对齐到时间戳的间隔整数倍（各周期为 time.time() // 间隔），
+                多副本时所有副本的触发时间相同；否则从启动时间开始计算
         """
-        trigger = IntervalTrigger(hours=interval_hours)
+        now = datetime.now()
+        interval = timedelta(hours=interval_hours)
+        lead = timedelta(seconds=prefetch_lead_seconds)
+        if align:
+            seconds = interval.total_seconds()
+            start = datetime.fromtimestamp(now.timestamp() // seconds * seconds)
+        else:
+            start = now
+        trigger = IntervalTrigger(hours=interval_hours, start_date=start)
+        
+        # 启动时立即执行一次；对齐时若离下一个周期边界不足预取提前量则跳过，
+        # 避免短时间内连发两次报告，改为立即预取、到边界时发送
+        run_now = not align or start + interval - now >= lead
+        options = {'next_run_time': now} if run_now else {}
         
         self.scheduler.add_job(
             func,
             trigger=trigger,
             id=job_id,
             replace_existing=True,
-            next_run_time=datetime.now()  # 立即执行一次
+            coalesce=True,
+            misfire_grace_time=60,
+            **options
         )
+        self._anchors[job_id] = (start, interval, now if run_now else None)
         
         print(f"✅ 定时任务已添加: 每 {interval_hours} 小时执行一次")
+        
+        # 首次执行之后的每一轮都提前预取
+        if prefetch and timedelta(0) < lead < interval:
+            self.scheduler.add_job(
+                prefetch,
+                trigger=IntervalTrigger(hours=interval_hours, start_date=start + interval - lead),
+                id=f'{job_id}_prefetch',
+                replace_existing=True,
+                coalesce=True,
+                misfire_grace_time=60,
+                **({} if run_now else {'next_run_time': now})
+            )
+            print(f"✅ 预取任务已添加: 每次报告前 {prefetch_lead_seconds:.0f} 秒执行")
+    
+    def add_interval_job(self, func: Callable, interval_seconds: float, job_id: str):
+        """
+        添加按秒计的周期任务（如租约续约）
+        
+        Args:
+            func: 要执行的异步函数
+            interval_seconds: 执行间隔（秒）
+            job_id: 任务ID
+        """
+        self.scheduler.add_job(
+            func,
+            trigger=IntervalTrigger(seconds=interval_seconds),
+            id=job_id,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
+    
+    def planned_run_time(self, job_id: str = 'monitoring_report') -> Optional[datetime]:
+        """
+        获取任务最近一次的计划执行时间（不晚于当前时间，包括启动时的立即执行）
+        
+        Args:
+            job_id: 任务ID
+            
+        Returns:
+            计划执行时间，任务不存在时返回 None
+        """
+        if job_id not in self._anchors:
+            return None
+        
+        start, interval, first_run = self._anchors[job_id]
+        now = datetime.now()
+        planned = start + interval * max(0, (now - start) // interval)
+        if first_run and planned < first_run <= now:
+            return first_run
+        return planned
     
     def start(self):
         """启动调度器"""
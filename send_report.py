@@ -1,44 +1,127 @@
 """
 GitHub Actions 专用脚本
 仅发送一次报告，然后退出
+
+为缩短冷启动时间，只在需要时导入模块，并且不依赖 python-telegram-bot：
+消息直接通过 Bot API 的 HTTP 接口发送。依赖见 requirements-oneshot.txt。
+
+用法:
+    python send_report.py
+    python send_report.py --profile [输出文件]   # 在采样分析器下运行一次
 """
-import asyncio
+import argparse
+import contextlib
+import importlib
 import sys
-from config import Config
-from nansen_client import NansenClient
-from formatters import MessageFormatter
-from telegram import Bot
-from telegram.constants import ParseMode
+import time
+from datetime import datetime
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+
+# 各模块的导入耗时（秒）
+IMPORT_TIMES = {}
+
+
+def timed_import(name: str):
+    """导入模块并记录耗时"""
+    started_at = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, time.perf_counter() - started_at)
+    return module
 
 
-async def send_report_once():
-    """发送一次监控报告"""
+def print_startup_stats(started_at: float):
+    """输出导入耗时明细和内存峰值"""
+    total = time.perf_counter() - started_at
+    imports = sum(IMPORT_TIMES.values())
+
+    print("\n⏱ 导入耗时:")
+    for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<16} {seconds * 1000:>7.1f} ms")
+    print(f"  {'合计':<16} {imports * 1000:>7.1f} ms / 总运行 {total:.1f} s")
+
+    try:
+        import resource
+        # Linux 上 ru_maxrss 单位为 KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"💾 内存峰值: {peak / 1024:.1f} MB")
+    except ImportError:
+        pass
+
+
+class TelegramSendError(Exception):
+    """Telegram 发送失败（信息中已去掉 Bot Token）"""
+
+
+def send_telegram_message(token: str, chat_id: str, text: str):
+    """通过 Bot API 发送 Markdown 消息"""
+    requests = timed_import('requests')
+
+    try:
+        response = requests.post(
+            f"{TELEGRAM_API_URL}/bot{token}/sendMessage",
+            json={
+                'chat_id': chat_id,
+                'text': text,
+                'parse_mode': 'Markdown'
+            },
+            timeout=30
+        )
+        result = response.json()
+    except requests.exceptions.RequestException as e:
+        # 请求 URL 中包含 Bot Token，异常信息和异常链（traceback）都会输出它：去掉 Token 并断开异常链
+        message = str(e).replace(token, '***') if token else str(e)
+        raise TelegramSendError(f"Telegram 请求失败 ({type(e).__name__}): {message}") from None
+    if not result.get('ok'):
+        raise TelegramSendError(f"Telegram 发送失败: {result.get('description', response.status_code)}")
+
+
+def send_report_once(profiler=None):
+    """
+    发送一次监控报告
+
+    Args:
+        profiler: 可选的 SamplingProfiler，用于记录各阶段耗时
+    """
+    stage = profiler.stage if profiler else (lambda name: contextlib.nullcontext())
+
     try:
         # 验证配置
+        Config = timed_import('config').Config
         Config.validate()
         print("✅ 配置验证通过")
+
+        # 单次运行没有历史基线，异常流动评分无意义，也省去导入 numpy
+        Config.ANOMALY_SCORING = False
         
         # 初始化 Nansen 客户端
         print("📡 正在获取监控数据...")
-        nansen_client = NansenClient(Config.NANSEN_API_KEY)
-        report_data = nansen_client.get_monitoring_report()
-        
+        timed_import('requests')
+        NansenClient = timed_import('nansen_client').NansenClient
+        nansen_client = NansenClient(Config.NANSEN_API_KEYS)
+        # 单次运行没有跨进程的缓存，超时的链也不会“下次更新”，因此不使用报告时限
+        with stage('fetch'):
+            report_data = nansen_client.get_monitoring_report(deadline=0)
+
         # 格式化消息
         print("📝 正在格式化报告...")
-        message = MessageFormatter.format_report(report_data)
-        
+        MessageFormatter = timed_import('formatters').MessageFormatter
+        with stage('format'):
+            message = MessageFormatter.format_report(report_data)
+
         # 发送到 Telegram
         print(f"📤 正在发送报告到 Chat ID: {Config.TELEGRAM_CHAT_ID}")
-        bot = Bot(token=Config.TELEGRAM_BOT_TOKEN)
-        await bot.send_message(
-            chat_id=Config.TELEGRAM_CHAT_ID,
-            text=message,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        
+        with stage('send'):
+            send_telegram_message(Config.TELEGRAM_BOT_TOKEN, Config.TELEGRAM_CHAT_ID, message)
+
         print("✅ 报告发送成功！")
         return 0
-        
+
+    except TelegramSendError as e:
+        # 错误信息已足够定位问题，不输出 traceback
+        print(f"❌ 错误: {str(e)}", file=sys.stderr)
+        return 1
+
     except Exception as e:
         print(f"❌ 错误: {str(e)}", file=sys.stderr)
         import traceback
@@ -46,6 +129,42 @@ async def send_report_once():
         return 1
 
 
+def run_profiled(output: str) -> int:
+    """在采样分析器下发送一次报告，写出折叠栈文件并打印摘要"""
+    from profiling import SamplingProfiler
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        exit_code = send_report_once(profiler)
+    finally:
+        profiler.stop()
+
+    profiler.write_folded(output)
+    print(f"\n🔬 性能分析\n{profiler.summary()}")
+    print(f"\n📄 折叠栈已写入 {output}（可用 flamegraph.pl 或 speedscope 查看）")
+    return exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发送一次监控报告")
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded",
+        metavar='OUTPUT',
+        help="在采样分析器下运行，并写出折叠栈文件"
+    )
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    if args.profile:
+        exit_code = run_profiled(args.profile)
+    else:
+        exit_code = send_report_once()
+    print_startup_stats(started_at)
+    return exit_code
+
+
 if __name__ == '__main__':
-    exit_code = asyncio.run(send_report_once())
-    sys.exit(exit_code)
+    sys.exit(main())
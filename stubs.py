@@ -0,0 +1,294 @@
+"""
+本地测试桩
+模拟 Nansen API 和 Telegram Bot API，用于离线压测和基准测试（无需真实 API Key）
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+from key_pool import TokenBucket
+
+
+def synthetic_holdings(chain: str, count: int, seed: Optional[int] = None) -> List[Dict]:
+    """
+    生成与 smart-money/holdings 响应格式一致的持仓数据
+
+    Args:
+        chain: 区块链名称
+        count: 代币数量
+        seed: 随机种子，相同种子生成相同数据
+    """
+    rng = random.Random(f"{chain}:{seed}" if seed is not None else None)
+    items = []
+
+    for i in range(count):
+        items.append({
+            'chain': chain,
+            'token_address': f"0x{rng.getrandbits(160):040x}",
+            'token_symbol': f"TK{i}",
+            'value_usd': round(rng.lognormvariate(13, 2), 2),
+            'balance_24h_percent_change': round(rng.gauss(0, 5), 4),
+            'holders_count': rng.randint(1, 500)
+        })
+
+    items.sort(key=lambda item: item['value_usd'], reverse=True)
+    return items
+
+
+class StubNansenServer:
+    """
+    本地 Nansen API 桩服务
+
+    - 按 apikey 独立限速，超出时返回 429
+    - keys 不为空时，未知 Key 返回 401
+    - 每个请求延迟 latency 秒；以 tail_ratio 的概率改为延迟 tail_latency 秒
+    """
+
+    def __init__(
+        self,
+        keys: Optional[List[str]] = None,
+        rate: float = 10,
+        burst: float = 1,
+        latency: float = 0.0,
+        tail_ratio: float = 0.0,
+        tail_latency: float = 0.0,
+        holdings_count: int = 200
+    ):
+        self.keys = set(keys or [])
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+        self.tail_ratio = tail_ratio
+        self.tail_latency = tail_latency
+        self.holdings_count = holdings_count
+
+        self.stats = {'requests': 0, 'ok': 0, 'rejected': 0, 'unauthorized': 0}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubNansenServer':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                status, payload = stub.handle(self.path, self.headers.get('apikey', ''), body)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, path: str, apikey: str, body: Dict):
+        """处理一个请求，返回 (状态码, 响应体)"""
+        with self._lock:
+            self.stats['requests'] += 1
+
+            if self.keys and apikey not in self.keys:
+                self.stats['unauthorized'] += 1
+                return 401, {'error': 'unauthorized'}
+
+            bucket = self._buckets.setdefault(apikey, TokenBucket(self.rate, self.burst))
+            if bucket.available(time.monotonic()) < 1:
+                self.stats['rejected'] += 1
+                return 429, {'error': 'rate limit exceeded'}
+            bucket.take()
+
+        delay = self.latency
+        if self.tail_ratio and random.random() < self.tail_ratio:
+            delay = self.tail_latency
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            self.stats['ok'] += 1
+
+        chains = body.get('chains') or ['ethereum']
+        limit = body.get('pagination', {}).get('limit', self.holdings_count)
+        data = []
+        for chain in chains:
+            data.extend(synthetic_holdings(chain, min(limit, self.holdings_count), seed=0))
+        return 200, {'data': data}
+
+
+class FakeTelegramServer:
+    """
+    本地 Telegram Bot API 假服务
+
+    支持 getMe / getUpdates（长轮询）/ setWebhook / deleteWebhook / sendMessage /
+    editMessageText / deleteMessage，并记录每次发送消息的时间。
+    使用方式: Application.builder().base_url(f"{server.url}/bot")
+    """
+
+    BOT_USER = {
+        'id': 100000,
+        'is_bot': True,
+        'first_name': 'FakeBot',
+        'username': 'fake_bot',
+        'can_join_groups': True,
+        'can_read_all_group_messages': False,
+        'supports_inline_queries': False
+    }
+
+    def __init__(self):
+        self.sent: List[Dict] = []  # {'method', 'chat_id', 'text', 'at'}
+        self.calls: Dict[str, int] = {}
+        self._updates: List[Dict] = []
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._cond = threading.Condition()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeTelegramServer':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                raw = self.rfile.read(length).decode()
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(raw or '{}')
+                else:
+                    params = dict(parse_qsl(raw))
+
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                payload = json.dumps({'ok': True, 'result': fake.handle(method, params)}).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._cond.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def make_command_update(self, text: str, chat_id: int, user_id: Optional[int] = None) -> Dict:
+        """构造一个包含命令的 Update（JSON 格式）"""
+        with self._cond:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+
+        command = text.split()[0]
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': user_id or chat_id, 'is_bot': False, 'first_name': 'user'},
+                'text': text,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+            }
+        }
+
+    def push_update(self, update: Dict):
+        """放入一个 Update，供 getUpdates 返回"""
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+
+    def first_reply_at(self, chat_id: int) -> Optional[float]:
+        """某个聊天收到第一条消息的时间（time.perf_counter）"""
+        with self._cond:
+            for item in self.sent:
+                if item['chat_id'] == chat_id:
+                    return item['at']
+        return None
+
+    def handle(self, method: str, params: Dict):
+        with self._cond:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getMe':
+            return self.BOT_USER
+        if method in ('setWebhook', 'deleteWebhook', 'deleteMessage'):
+            return True
+        if method == 'getUpdates':
+            return self._get_updates(params)
+        if method in ('sendMessage', 'editMessageText'):
+            return self._record_message(method, params)
+        return True
+
+    def _get_updates(self, params: Dict) -> List[Dict]:
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+            while not self._updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return list(self._updates)
+
+    def _record_message(self, method: str, params: Dict) -> Dict:
+        chat_id = int(params.get('chat_id', 0))
+        with self._cond:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+            self.sent.append({
+                'method': method,
+                'chat_id': chat_id,
+                'text': params.get('text', ''),
+                'at': time.perf_counter()
+            })
+
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': self.BOT_USER,
+            'text': params.get('text', '')
+        }
@@ -0,0 +1,212 @@
+"""
+代币内存索引
+以最新的智能资金持仓为数据源，支持按代号前缀（前缀树）和合约地址（哈希表）查询
+"""
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+# 索引条目的键: (链名称, 小写合约地址)
+EntryKey = Tuple[str, str]
+
+
+class _TrieNode:
+    __slots__ = ('children', 'keys', 'max_value')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.keys: Set[EntryKey] = set()  # 代号恰好在此结束的条目
+        # 子树内持仓价值的上界：插入和涨价时抬高，删除和降价时不变，查询展开节点时收紧
+        self.max_value = 0.0
+
+
+class TokenIndex:
+    """
+    代币索引
+
+    每次获取某条链的持仓后调用 update_chain，只增删改有变化的条目；
+    lookup 完全在内存中完成，不产生 API 调用。
+    """
+
+    def __init__(self):
+        self._entries: Dict[EntryKey, Dict] = {}
+        self._by_chain: Dict[str, Set[EntryKey]] = {}
+        self._by_address: Dict[str, Set[EntryKey]] = {}
+        self._root = _TrieNode()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update_chain(self, chain_name: str, holdings: List[Dict]):
+        """
+        用某条链最新的持仓数据刷新索引
+
+        Args:
+            chain_name: 链名称（如 'ETH'）
+            holdings: smart-money/holdings 返回的条目
+        """
+        updated_at = datetime.now().isoformat()
+        fresh: Dict[EntryKey, Dict] = {}
+
+        for item in holdings:
+            symbol = item.get('token_symbol') or 'Unknown'
+            # Solana 等链的地址区分大小写：原样保存用于显示，小写形式只用于查找
+            address = item.get('token_address') or symbol
+            value_usd = item.get('value_usd', 0)
+            change_pct = item.get('balance_24h_percent_change', 0)
+
+            fresh[(chain_name, address.lower())] = {
+                'chain': chain_name,
+                'symbol': symbol,
+                'address': address,
+                'value_usd': value_usd,
+                'holders': item.get('holders_count', 0),
+                'net_flow_usd': value_usd * change_pct / 100,
+                'updated_at': updated_at
+            }
+
+        with self._lock:
+            old_keys = self._by_chain.get(chain_name, set())
+            new_keys = set(fresh)
+
+            for key in old_keys - new_keys:
+                self._remove(key)
+
+            for key, entry in fresh.items():
+                previous = self._entries.get(key)
+                if previous is not None and previous['symbol'] != entry['symbol']:
+                    self._remove(key)
+                    previous = None
+
+                if previous is None:
+                    self._insert(key, entry)
+                else:
+                    if entry['value_usd'] > previous['value_usd']:
+                        self._raise_bound(entry['symbol'], entry['value_usd'])
+                    previous.update(entry)
+
+            self._by_chain[chain_name] = new_keys
+
+    def lookup(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        查询代币
+
+        Args:
+            query: 合约地址，或代号/代号前缀（不区分大小写）
+            limit: 最多返回的条目数
+
+        Returns:
+            匹配的条目（代号完全匹配优先，其余按持仓价值降序）
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        with self._lock:
+            keys = self._by_address.get(query.lower())
+            if keys:
+                return sorted(
+                    (dict(self._entries[key]) for key in keys),
+                    key=lambda entry: entry['value_usd'],
+                    reverse=True
+                )[:limit]
+
+            node = self._find(query.upper())
+            if node is None:
+                return []
+
+            exact = heapq.nlargest(limit, node.keys, key=lambda key: self._entries[key]['value_usd'])
+            prefixed = []
+            if len(exact) < limit:
+                prefixed = self._top_by_value(node, limit - len(exact))
+
+            return [dict(self._entries[key]) for key in exact + prefixed]
+
+    def _find(self, symbol: str) -> Optional[_TrieNode]:
+        node = self._root
+        for char in symbol:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _top_by_value(self, node: _TrieNode, limit: int) -> List[EntryKey]:
+        """
+        前缀下（不含 node 本身）持仓价值最高的 limit 个条目
+
+        按价值上界做最佳优先搜索：队列中同时放节点（上界）和条目（实际价值），
+        条目出队时一定不小于剩余的所有候选，短前缀也无需遍历整个子树
+        """
+        result = []
+        counter = 0  # 价值相同时保证可比较
+        queue = []
+        for child in node.children.values():
+            queue.append((-child.max_value, counter, child))
+            counter += 1
+        heapq.heapify(queue)
+
+        while queue and len(result) < limit:
+            _, _, item = heapq.heappop(queue)
+            if not isinstance(item, _TrieNode):
+                result.append(item)
+                continue
+
+            # 展开节点，顺便把上界收紧为实际值
+            bound = 0.0
+            for key in item.keys:
+                value = self._entries[key]['value_usd']
+                bound = max(bound, value)
+                heapq.heappush(queue, (-value, counter, key))
+                counter += 1
+            for child in item.children.values():
+                bound = max(bound, child.max_value)
+                heapq.heappush(queue, (-child.max_value, counter, child))
+                counter += 1
+            item.max_value = bound
+
+        return result
+
+    def _raise_bound(self, symbol: str, value: float):
+        node = self._root
+        for char in symbol.upper():
+            node = node.children[char]
+            node.max_value = max(node.max_value, value)
+
+    def _insert(self, key: EntryKey, entry: Dict):
+        self._entries[key] = entry
+        self._by_address.setdefault(key[1], set()).add(key)
+
+        node = self._root
+        for char in entry['symbol'].upper():
+            node = node.children.setdefault(char, _TrieNode())
+            node.max_value = max(node.max_value, entry['value_usd'])
+        node.keys.add(key)
+
+    def _remove(self, key: EntryKey):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        keys = self._by_address.get(key[1])
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._by_address[key[1]]
+
+        # 删除代号路径上不再使用的节点
+        path = [self._root]
+        for char in entry['symbol'].upper():
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].keys.discard(key)
+
+        symbol = entry['symbol'].upper()
+        for depth in range(len(symbol), 0, -1):
+            node = path[depth]
+            if node.keys or node.children:
+                break
+            del path[depth - 1].children[symbol[depth - 1]]
@@ -0,0 +1,198 @@
+"""
+Nansen API 传输层
+NansenClient 通过传输层发送 HTTP 请求，可替换为录制、回放或合成数据，用于离线复现和性能测试
+
+- http: 直接请求 Nansen API（默认）
+- record:<文件>: 请求真实 API，同时把响应和耗时追加写入 gzip 压缩的录制文件（不含 API Key）
+- replay:<文件>: 不访问网络，按请求匹配录制的响应，并按录制耗时 × latency_scale 延迟返回
+- synthetic[:<数量>]: 不访问网络，生成指定数量的持仓数据
+
+用法:
+    NANSEN_TRANSPORT=record:cassettes/prod.jsonl.gz python send_report.py
+    NANSEN_TRANSPORT=replay:cassettes/prod.jsonl.gz python send_report.py
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from http.client import responses as HTTP_REASONS
+from typing import Dict, Optional, Tuple
+
+import requests
+
+
+def _request_key(method: str, endpoint: str, body: Optional[Dict]) -> Tuple[str, str, str]:
+    """请求的匹配键：方法 + 端点 + 规范化的请求体"""
+    return method, endpoint, json.dumps(body or {}, sort_keys=True, ensure_ascii=False)
+
+
+def _build_response(url: str, status: int, content: str, elapsed: float) -> requests.Response:
+    """构造与真实请求一致的 requests.Response，调用方无需区分来源"""
+    response = requests.Response()
+    response.status_code = status
+    response.reason = HTTP_REASONS.get(status, '')
+    response.url = url
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = content.encode('utf-8')
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class HttpTransport:
+    """直接请求 Nansen API"""
+
+    def send(
+        self,
+        method: str,
+        base_url: str,
+        endpoint: str,
+        headers: Dict,
+        body: Optional[Dict],
+        timeout: float
+    ) -> requests.Response:
+        url = f"{base_url}{endpoint}"
+        if method == 'POST':
+            return requests.post(url, headers=headers, json=body or {}, timeout=timeout)
+        return requests.get(url, headers=headers, params=body, timeout=timeout)
+
+
+class RecordingTransport:
+    """
+    请求真实 API 并录制
+
+    每次交互作为一行 JSON 追加到 gzip 文件（每次写入一个 gzip 成员，进程中途退出也不会丢失已录制的内容）。
+    录制内容: method, endpoint, body, status, content, elapsed；连接错误记录为 error。
+    """
+
+    def __init__(self, path: str, inner: Optional[HttpTransport] = None):
+        self.path = path
+        self.inner = inner or HttpTransport()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def send(self, method, base_url, endpoint, headers, body, timeout) -> requests.Response:
+        entry = {'method': method, 'endpoint': endpoint, 'body': body}
+        started_at = time.monotonic()
+
+        try:
+            response = self.inner.send(method, base_url, endpoint, headers, body, timeout)
+        except requests.exceptions.RequestException as e:
+            entry.update(error=str(e), elapsed=time.monotonic() - started_at)
+            self._write(entry)
+            raise
+
+        entry.update(status=response.status_code, content=response.text, elapsed=time.monotonic() - started_at)
+        self._write(entry)
+        return response
+
+    def _write(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(line)
+
+
+class ReplayTransport:
+    """
+    回放录制文件，不访问网络
+
+    同一请求录制了多次时按录制顺序依次返回，用完后从头循环，因此可以反复生成报告。
+    没有完全相同的请求体时退回到同一端点的录制。
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        """
+        Args:
+            path: 录制文件
+            latency_scale: 延迟倍数，1 为录制时的耗时，0 为不等待
+        """
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exact: Dict[Tuple[str, str, str], deque] = defaultdict(deque)
+        self._by_endpoint: Dict[Tuple[str, str], deque] = defaultdict(deque)
+
+        count = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._exact[_request_key(entry['method'], entry['endpoint'], entry.get('body'))].append(entry)
+                self._by_endpoint[(entry['method'], entry['endpoint'])].append(entry)
+                count += 1
+
+        if not count:
+            raise ValueError(f"录制文件为空: {path}")
+        print(f"📼 已加载 {count} 条录制（{path}）")
+
+    def _next(self, method: str, endpoint: str, body: Optional[Dict]) -> Optional[Dict]:
+        with self._lock:
+            entries = self._exact.get(_request_key(method, endpoint, body)) or self._by_endpoint.get((method, endpoint))
+            if not entries:
+                return None
+            entry = entries.popleft()
+            entries.append(entry)
+            return entry
+
+    def send(self, method, base_url, endpoint, headers, body, timeout) -> requests.Response:
+        entry = self._next(method, endpoint, body)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"录制文件中没有 {method} {endpoint} 的请求")
+
+        delay = min(entry.get('elapsed', 0) * self.latency_scale, timeout)
+        if delay > 0:
+            time.sleep(delay)
+
+        if 'error' in entry:
+            raise requests.exceptions.ConnectionError(entry['error'])
+        return _build_response(f"{base_url}{endpoint}", entry['status'], entry['content'], delay)
+
+
+class SyntheticTransport:
+    """生成任意规模的持仓数据，不访问网络"""
+
+    def __init__(self, holdings_count: int = 200, latency: float = 0.0, seed: int = 0):
+        self.holdings_count = holdings_count
+        self.latency = latency
+        self.seed = seed
+
+    def send(self, method, base_url, endpoint, headers, body, timeout) -> requests.Response:
+        from stubs import synthetic_holdings
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        # 数量由 holdings_count 决定（忽略请求中的分页），用于测试任意规模的数据
+        data = []
+        if endpoint.endswith('/smart-money/holdings'):
+            for chain in (body or {}).get('chains') or ['ethereum']:
+                data.extend(synthetic_holdings(chain, self.holdings_count, seed=self.seed))
+
+        return _build_response(f"{base_url}{endpoint}", 200, json.dumps({'data': data}), self.latency)
+
+
+def create_transport(spec: str, latency_scale: float = 1.0):
+    """
+    根据配置创建传输层
+
+    Args:
+        spec: 'http'、'record:<文件>'、'replay:<文件>' 或 'synthetic[:<数量>]'
+        latency_scale: 回放延迟倍数
+    """
+    mode, _, arg = (spec or 'http').partition(':')
+
+    if mode == 'http':
+        return HttpTransport()
+    if mode == 'record' and arg:
+        return RecordingTransport(arg)
+    if mode == 'replay' and arg:
+        return ReplayTransport(arg, latency_scale=latency_scale)
+    if mode == 'synthetic':
+        return SyntheticTransport(int(arg) if arg else 200)
+
+    raise ValueError(f"无效的 NANSEN_TRANSPORT: {spec}")